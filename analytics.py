@@ -0,0 +1,51 @@
+"""Vectorised analytics over the long-format energy frame."""
+import numpy as np
+import pandas as pd
+
+from energy_data import DATA_PATH, derived
+from instrumentation import timed
+
+DEFAULT_ANOMALY_WINDOW = 5
+DEFAULT_ANOMALY_THRESHOLD = 1.2
+
+
+@timed()
+def detect_anomalies(df: pd.DataFrame, window: int = DEFAULT_ANOMALY_WINDOW,
+                     threshold: float = DEFAULT_ANOMALY_THRESHOLD) -> pd.DataFrame:
+    """Flag years whose consumption exceeds ``threshold`` x the mean of the
+    previous ``window`` years, for every (Sector, Fuel) series at once.
+
+    Rows are sorted by (Sector, Fuel, Year) - by category codes when the
+    labels are categorical - and the trailing means come from one cumulative
+    sum, so the cost is linear in the number of rows.
+    Missing values are skipped in the mean, as ``Series.mean()`` would.
+    """
+    s = df.sort_values(['Sector', 'Fuel', 'Year'], kind='mergesort').reset_index(drop=True)
+    v = s['Consumption_ktoe'].to_numpy(dtype=float)
+    ok = ~np.isnan(v)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(ok, v, 0.0))))
+    ccnt = np.concatenate(([0], np.cumsum(ok)))
+
+    idx = np.arange(len(s))
+    start = np.maximum(idx - window, 0)
+    wsum = csum[idx] - csum[start]
+    wcnt = ccnt[idx] - ccnt[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        past_mean = wsum / wcnt
+        above = v > threshold * past_mean
+
+    # position inside its own series; only full windows are considered
+    pos = s.groupby(['Sector', 'Fuel'], sort=False, observed=True).cumcount().to_numpy()
+    flag = (pos >= window) & (wcnt > 0) & above
+
+    out = s.loc[flag, ['Sector', 'Fuel', 'Year', 'Consumption_ktoe']].copy()
+    out['Past_mean'] = past_mean[flag]
+    return out.reset_index(drop=True)
+
+
+def cached_anomalies(window: int = DEFAULT_ANOMALY_WINDOW,
+                     threshold: float = DEFAULT_ANOMALY_THRESHOLD,
+                     path: str = DATA_PATH) -> pd.DataFrame:
+    """Anomalies for all sectors, computed once per data version and setting."""
+    return derived(('anomalies', int(window), float(threshold)),
+                   lambda df: detect_anomalies(df, int(window), float(threshold)), path)
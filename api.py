@@ -0,0 +1,328 @@
+"""Read-only HTTP API over the standardized dataset, for services that want the
+dashboard's numbers without a Streamlit session.
+
+    python api.py --port 8000
+    curl 'localhost:8000/compare?sector=Industry&year_a=1990&year_b=2023'
+    curl 'localhost:8000/consumption?sector=Domestic&format=csv'
+
+Endpoints (all GET; ``format=json|csv`` where a table is returned):
+
+    /meta                                       data version, sectors, fuels, years
+    /consumption?sector=&year=&fuel=            long rows, every filter optional
+    /pivot?year=                                Sector x Fuel consumption for a year
+    /compare?sector=&year_a=&year_b=            report comparison summary
+    /anomalies?sector=&window=&threshold=       anomaly points (all sectors by default)
+    /costs?sector=&year=                        cost table for a sector/year
+    /costs/compare?sector=&year_a=&year_b=      cost change between two years
+    /forecast?sector=&model=&horizon=           projected consumption per fuel
+    /report.pdf?sector=&year_a=&year_b=         the dashboard's PDF report
+
+Everything is served from the same process-wide caches the dashboard uses
+(``energy_data`` / ``cached_cube`` / ``cached_costs``). Responses carry an
+ETag derived from the data (and price) version and the request, so clients
+can revalidate with If-None-Match, and rendered bodies are kept in an LRU.
+Large CSV results are streamed in chunks instead of being built in memory.
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+from analytics import DEFAULT_ANOMALY_THRESHOLD, DEFAULT_ANOMALY_WINDOW, cached_anomalies
+from costs import cached_costs, price_stamp
+from energy_cube import cached_cube
+from energy_data import DATA_PATH, data_version, load_energy_data
+from forecast import DEFAULT_HORIZON, DEFAULT_MODEL, MAX_HORIZON, MODELS, cached_forecasts
+
+RESPONSE_CACHE_SIZE = 256
+MAX_CACHED_BYTES = 4 * 1024 * 1024   # larger bodies are rebuilt (or streamed) each time
+STREAM_ROWS = 20_000                 # CSV results above this many rows are streamed
+CHUNK_ROWS = 10_000
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseCache:
+    """Thread-safe LRU of (content_type, body) keyed on ETag."""
+
+    def __init__(self, size=RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key, item):
+        if len(item[1]) > MAX_CACHED_BYTES:
+            return
+        with self._lock:
+            self._items[key] = item
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+# ---------------- Parameters ----------------
+def _int(params, name, required=True, default=None):
+    value = params.get(name)
+    if value is None:
+        if required:
+            raise ApiError(400, f"missing parameter '{name}'")
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer, got {value!r}")
+
+
+def _float(params, name, default):
+    try:
+        return float(params.get(name, default))
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be a number, got {params[name]!r}")
+
+
+def _sector(cube, params, required=True):
+    sector = params.get("sector")
+    if sector is None:
+        if required:
+            raise ApiError(400, "missing parameter 'sector'")
+        return None
+    if sector not in cube.sectors:
+        raise ApiError(404, f"unknown sector {sector!r}")
+    return sector
+
+
+def _year(cube, params, name="year"):
+    year = _int(params, name)
+    if year not in cube.years:
+        raise ApiError(404, f"no data for {name}={year}")
+    return year
+
+
+def _pair(cube, params):
+    year_a, year_b = _year(cube, params, "year_a"), _year(cube, params, "year_b")
+    if year_a == year_b:
+        raise ApiError(400, "year_a and year_b must differ")
+    return year_a, year_b
+
+
+# ---------------- Endpoints ----------------
+# Each returns a DataFrame (rendered as JSON or CSV), a dict (JSON) or
+# (content_type, bytes).
+def meta(path, params):
+    cube = cached_cube(path)
+    return {"version": data_version(path), "sectors": cube.sectors, "fuels": cube.fuels,
+            "years": [int(y) for y in cube.years]}
+
+
+def consumption(path, params):
+    df = load_energy_data(path)
+    mask = pd.Series(True, index=df.index)
+    if "sector" in params:
+        mask &= df['Sector'] == _sector(cached_cube(path), params)
+    if "year" in params:
+        mask &= df['Year'] == _int(params, "year")
+    if "fuel" in params:
+        mask &= df['Fuel'] == params["fuel"]
+    return df[mask]
+
+
+def pivot(path, params):
+    cube = cached_cube(path)
+    return cube.fuel_by_sector(_year(cube, params)).reset_index()
+
+
+def compare(path, params):
+    cube = cached_cube(path)
+    sector = _sector(cube, params)
+    # same frame as report.compute_compare_summary, read from the cached cube
+    return cube.compare_summary(sector, *_pair(cube, params))
+
+
+def anomalies(path, params):
+    cube = cached_cube(path)
+    window = _int(params, "window", required=False, default=DEFAULT_ANOMALY_WINDOW)
+    if not 2 <= window <= 50:
+        raise ApiError(400, "'window' must be between 2 and 50")
+    found = cached_anomalies(window, _float(params, "threshold", DEFAULT_ANOMALY_THRESHOLD), path)
+    sector = _sector(cube, params, required=False)
+    return found if sector is None else found[found['Sector'] == sector]
+
+
+def costs(path, params):
+    cube = cached_cube(path)
+    return cached_costs(path).cost_table(_sector(cube, params), _year(cube, params))
+
+
+def costs_compare(path, params):
+    cube = cached_cube(path)
+    return cached_costs(path).compare_costs(_sector(cube, params), *_pair(cube, params))
+
+
+def forecast(path, params):
+    cube = cached_cube(path)
+    sector = _sector(cube, params)
+    model = params.get("model", DEFAULT_MODEL)
+    if model not in MODELS:
+        raise ApiError(400, f"'model' must be one of {', '.join(MODELS)}")
+    horizon = _int(params, "horizon", required=False, default=DEFAULT_HORIZON)
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ApiError(400, f"'horizon' must be between 1 and {MAX_HORIZON}")
+    return cached_forecasts(horizon, path).sector_paths(sector, model)
+
+
+def report_pdf(path, params):
+    from report import generate_report
+
+    cube = cached_cube(path)
+    sector = _sector(cube, params)
+    year_a, year_b = _pair(cube, params)
+    return "application/pdf", generate_report(cube, sector, year_a, year_b, data_version(path),
+                                              cached_forecasts(path=path))
+
+
+ROUTES = {
+    "/meta": meta,
+    "/consumption": consumption,
+    "/pivot": pivot,
+    "/compare": compare,
+    "/anomalies": anomalies,
+    "/costs": costs,
+    "/costs/compare": costs_compare,
+    "/forecast": forecast,
+    "/report.pdf": report_pdf,
+}
+
+
+def _etag(path, route, params) -> str:
+    """Quoted ETag for a request: data + price version and the canonical query."""
+    h = hashlib.sha256(data_version(path).encode())
+    h.update(repr(price_stamp()).encode())
+    h.update(route.encode())
+    h.update(json.dumps(sorted(params.items())).encode())
+    return f'"{h.hexdigest()[:32]}"'
+
+
+def _csv_chunks(frame: pd.DataFrame):
+    for start in range(0, len(frame), CHUNK_ROWS):
+        yield frame.iloc[start:start + CHUNK_ROWS].to_csv(index=False, header=start == 0).encode()
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "EnergyAPI/1.0"
+    data_path = DATA_PATH
+    cache = ResponseCache()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = url.path.rstrip("/") or "/"
+        params = dict(parse_qsl(url.query))
+        endpoint = ROUTES.get(route)
+        if endpoint is None:
+            return self._send_error(404, f"unknown endpoint {route!r}; try one of {sorted(ROUTES)}")
+        fmt = params.get("format", "json")
+        if fmt not in ("json", "csv"):
+            return self._send_error(400, "'format' must be json or csv")
+
+        try:
+            etag = _etag(self.data_path, route, params)
+        except OSError as exc:
+            return self._send_error(503, f"dataset unavailable: {exc}")
+        if etag in (t.strip() for t in self.headers.get("If-None-Match", "").split(",")):
+            return self._send(304, etag=etag)
+        cached = self.cache.get(etag)
+        if cached is not None:
+            return self._send(200, *cached, etag=etag)
+
+        params.pop("format", None)
+        try:
+            result = endpoint(self.data_path, params)
+        except ApiError as exc:
+            return self._send_error(exc.status, str(exc))
+        except Exception as exc:  # keep serving; the traceback goes to the log
+            self.log_error("%s failed: %r", route, exc)
+            return self._send_error(500, "internal error")
+
+        if isinstance(result, pd.DataFrame) and fmt == "csv" and len(result) > STREAM_ROWS:
+            return self._stream(_csv_chunks(result), "text/csv; charset=utf-8", etag)
+        if isinstance(result, pd.DataFrame):
+            if fmt == "csv":
+                item = ("text/csv; charset=utf-8", result.to_csv(index=False).encode())
+            else:
+                item = ("application/json", result.to_json(orient="records").encode())
+        elif isinstance(result, dict):
+            item = ("application/json", json.dumps(result).encode())
+        else:
+            item = result
+        self.cache.put(etag, item)
+        self._send(200, *item, etag=etag)
+
+    def _send(self, status, content_type=None, body=b"", etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # always revalidate; 304 is cheap
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send(status, "application/json", json.dumps({"error": message}).encode())
+
+    def _stream(self, chunks, content_type, etag):
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def make_server(host="127.0.0.1", port=8000, data_path=DATA_PATH) -> ThreadingHTTPServer:
+    handler = type("Handler", (ApiHandler,), {"data_path": data_path, "cache": ResponseCache()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the UK energy data as a JSON/CSV API.")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8000, help="port (default: %(default)s)")
+    parser.add_argument("--data", default=DATA_PATH, help="standardized CSV (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    cached_cube(args.data)  # load before accepting requests
+    server = make_server(args.host, args.port, args.data)
+    print(f"Serving on http://{args.host}:{server.server_port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
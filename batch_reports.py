@@ -0,0 +1,198 @@
+"""Generate comparison PDF reports in bulk, outside Streamlit.
+
+Examples:
+    # every sector, two explicit pairs
+    python batch_reports.py --pairs 1970:2023 2000:2023 --out reports
+
+    # two sectors, every pair A<B from a set of years, 8 worker processes
+    python batch_reports.py --sectors Industry Domestic --years 1990 2000 2010 2023 --workers 8
+
+    # one consolidated all-sectors report per pair
+    python batch_reports.py --overview --pairs 1990:2023
+
+Jobs are split into one batch per worker process, so each process loads the
+data and warms its kaleido renderer once; for --overview reports the worker
+processes render the charts of each report instead. A manifest in the output
+directory records the data hash each PDF was built from (for --overview
+reports, also the sectors and projection); a job is skipped when its PDF
+exists and these are unchanged (use --force to rebuild).
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from energy_cube import cached_cube
+from energy_data import DATA_PATH, data_version
+from forecast import DEFAULT_HORIZON, DEFAULT_MODEL, cached_forecasts
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def report_filename(sector, year_a, year_b) -> str:
+    # same name the dashboard's download button uses
+    return f"{sector}_{year_a}_vs_{year_b}.pdf".replace(os.sep, "-")
+
+
+def overview_filename(year_a, year_b) -> str:
+    return f"All_sectors_{year_a}_vs_{year_b}.pdf"
+
+
+def _load_manifest(out_dir: str) -> dict:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(out_dir: str, manifest: dict) -> None:
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _run_batch(data_path: str, out_dir: str, jobs):
+    """Worker: render every job of one batch with a single data load and renderer."""
+    from report import generate_report
+
+    cube = cached_cube(data_path)
+    version = data_version(data_path)
+    forecasts = cached_forecasts(path=data_path)
+    done = []
+    for sector, year_a, year_b in jobs:
+        name = report_filename(sector, year_a, year_b)
+        tmp = os.path.join(out_dir, name + ".tmp")
+        generate_report(cube, sector, year_a, year_b, version, forecasts, target=tmp)
+        os.replace(tmp, os.path.join(out_dir, name))
+        done.append(name)
+    return done
+
+
+def build_jobs(sectors, pairs):
+    return [(s, a, b) for s in sectors for a, b in pairs]
+
+
+def run(jobs, data_path=DATA_PATH, out_dir="reports", workers=None, force=False, log=print):
+    """Generate the PDFs for ``jobs`` and return (generated, skipped) counts."""
+    os.makedirs(out_dir, exist_ok=True)
+    version = data_version(data_path)
+    manifest = _load_manifest(out_dir)
+
+    todo = [job for job in jobs
+            if force
+            or manifest.get(report_filename(*job)) != version
+            or not os.path.exists(os.path.join(out_dir, report_filename(*job)))]
+    skipped = len(jobs) - len(todo)
+    if not todo:
+        return 0, skipped
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+    batches = [todo[i::workers] for i in range(workers)]
+    if workers == 1:
+        pool = None
+        results = iter([_run_batch(data_path, out_dir, batches[0])])
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        futures = [pool.submit(_run_batch, data_path, out_dir, batch) for batch in batches]
+        results = (f.result() for f in as_completed(futures))
+
+    generated = 0
+    try:
+        for names in results:
+            for name in names:
+                manifest[name] = version
+            generated += len(names)
+            log(f"{generated}/{len(todo)} reports written")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        _save_manifest(out_dir, manifest)
+    return generated, skipped
+
+
+def run_overviews(pairs, sectors=None, data_path=DATA_PATH, out_dir="reports", workers=None, force=False,
+                  log=print, model=DEFAULT_MODEL, horizon=DEFAULT_HORIZON):
+    """One all-sectors PDF per pair, each written straight to disk; returns (generated, skipped)."""
+    from report import generate_overview_report
+
+    os.makedirs(out_dir, exist_ok=True)
+    cube = cached_cube(data_path)
+    sectors = list(sectors or cube.sectors)
+    # the same file name covers any sector selection and projection, so they are part of the entry
+    built = {"version": data_version(data_path), "sectors": sectors, "model": model, "horizon": horizon}
+    manifest = _load_manifest(out_dir)
+    generated = skipped = 0
+    try:
+        for year_a, year_b in pairs:
+            name = overview_filename(year_a, year_b)
+            target = os.path.join(out_dir, name)
+            if not force and manifest.get(name) == built and os.path.exists(target):
+                skipped += 1
+                continue
+            generate_overview_report(cube, year_a, year_b, built["version"], target + ".tmp", sectors,
+                                     model, horizon, path=data_path, workers=workers)
+            os.replace(target + ".tmp", target)
+            manifest[name] = built
+            generated += 1
+            log(f"{generated + skipped}/{len(pairs)} overview reports done")
+    finally:
+        _save_manifest(out_dir, manifest)
+    return generated, skipped
+
+
+def _parse_pair(text: str):
+    try:
+        a, b = (int(x) for x in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YEAR_A:YEAR_B, got {text!r}")
+    return a, b
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Batch-generate UK energy comparison PDF reports.")
+    parser.add_argument("--data", default=DATA_PATH, help="standardized CSV (default: %(default)s)")
+    parser.add_argument("--out", default="reports", help="output directory (default: %(default)s)")
+    parser.add_argument("--sectors", nargs="+", help="sectors to report on (default: all)")
+    parser.add_argument("--pairs", nargs="+", type=_parse_pair, default=[], metavar="A:B",
+                        help="explicit year pairs, e.g. 1970:2023")
+    parser.add_argument("--years", nargs="+", type=int, default=[],
+                        help="grid mode: every pair A<B drawn from these years")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count; 4 image renderers with --overview)")
+    parser.add_argument("--overview", action="store_true",
+                        help="one consolidated report per pair covering every selected sector")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the output is up to date")
+    args = parser.parse_args(argv)
+
+    cube = cached_cube(args.data)
+    sectors = args.sectors or cube.sectors
+    unknown = [s for s in sectors if s not in cube.sectors]
+    if unknown:
+        parser.error(f"unknown sector(s): {', '.join(unknown)}")
+
+    pairs = list(args.pairs) + list(itertools.combinations(sorted(set(args.years)), 2))
+    pairs = [(a, b) for a, b in dict.fromkeys(pairs) if a != b]
+    if not pairs:
+        parser.error("give at least one --pairs A:B or two or more --years")
+    bad_years = sorted({y for p in pairs for y in p} - set(cube.years))
+    if bad_years:
+        parser.error(f"year(s) not in the data: {', '.join(map(str, bad_years))}")
+
+    start = time.perf_counter()
+    if args.overview:
+        generated, skipped = run_overviews(pairs, sectors, args.data, args.out, args.workers, args.force)
+    else:
+        generated, skipped = run(build_jobs(sectors, pairs), args.data, args.out, args.workers, args.force)
+    print(f"Done: {generated} generated, {skipped} up to date, "
+          f"{time.perf_counter() - start:.1f}s -> {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""Headless performance benchmarks for the dashboard and its helpers.
+
+    python benchmarks/bench_dashboard.py                        # scales 1, 10, 100, 1000
+    python benchmarks/bench_dashboard.py --scales 1 10 --repeat 5 --out bench.json
+    python benchmarks/bench_dashboard.py --baseline bench_main.json --tolerance 1.3
+
+Every scale runs in a fresh subprocess against a synthetic copy of
+Standardized_Energy_Data.csv with roughly ``scale`` times as many rows,
+spread over more sectors, fuels and years (scale 1 is the real file). Each
+run times:
+
+* the app through Streamlit's AppTest: cold load, sector change, year
+  change, compare-pair change and PDF generation;
+* the helpers directly: compute_compare_summary, _figure_for_pdf,
+  build_pdf_report, plus the cube / anomaly / comparison engines;
+* process cold start: one full script execution in a fresh interpreter,
+  which must not import the report/export stack (``DEFERRED_MODULES``).
+
+Results go to JSON. With ``--baseline`` the run is compared against an
+earlier result file and the exit status is 1 when any median got slower
+than ``tolerance`` x the baseline. It is also 1 when a page load imported
+a deferred module, or when ``--max-startup`` is given and the cold start is
+slower than that many seconds.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "dashboard_app.py")
+SOURCE_CSV = os.path.join(ROOT, "Standardized_Energy_Data.csv")
+DEFAULT_SCALES = (1, 10, 100, 1000)
+# only the PDF path may import these; a plain page load must not
+DEFERRED_MODULES = ("report", "chart_export", "reportlab", "kaleido")
+
+# Executes the dashboard once in Streamlit's bare mode in a fresh interpreter
+_STARTUP_SNIPPET = """
+import json, runpy, sys, time
+start = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name="__main__")
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "loaded": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+# ---------------- Synthetic data ----------------
+def scale_factors(scale):
+    """Split ``scale`` into (sector, fuel, year) multipliers, e.g. 1000 -> (10, 10, 10)."""
+    per_dim = max(1, round(scale ** (1 / 3)))
+    return per_dim, per_dim, scale / (per_dim * per_dim)
+
+
+def synthesize(scale, path, seed=0):
+    """Write a scaled copy of the standardized CSV to ``path``; returns the row count.
+
+    Each real (Sector, Fuel) series is cloned into sector and fuel copies
+    ("Industry (2)", "Coal (3)") and stretched back in time by repeating
+    the 1970-2023 profile with multiplicative noise. Missing and '[x]'
+    cells follow the real series they were cloned from.
+    """
+    import numpy as np
+    import pandas as pd
+
+    real = pd.read_csv(SOURCE_CSV)
+    values = pd.to_numeric(real['Consumption_ktoe'].astype(str).str.replace('[x]', '', regex=False),
+                           errors='coerce')
+    real = real.assign(Value=values, Present=True)
+    series = real[['Sector', 'Fuel']].drop_duplicates().reset_index(drop=True)
+    base_years = sorted(real['Year'].unique())
+    grid = real.pivot_table(index=['Sector', 'Fuel'], columns='Year', values='Value', aggfunc='sum',
+                            dropna=False).reindex(pd.MultiIndex.from_frame(series), columns=base_years)
+    present = real.pivot_table(index=['Sector', 'Fuel'], columns='Year', values='Present', aggfunc='any',
+                               dropna=False).reindex(pd.MultiIndex.from_frame(series), columns=base_years)
+    present = present.fillna(False).astype(bool).to_numpy()
+    marker = present & grid.isna().to_numpy()
+
+    s_mult, f_mult, y_mult = scale_factors(scale)
+    n_years = max(2, round(len(base_years) * y_mult))
+    years = np.arange(base_years[-1] - n_years + 1, base_years[-1] + 1)
+    year_src = (years - base_years[0]) % len(base_years)   # profile repeats before 1970
+
+    sec_copy, fuel_copy, base = np.meshgrid(np.arange(s_mult), np.arange(f_mult), np.arange(len(series)),
+                                            indexing='ij')
+    sec_copy, fuel_copy, base = sec_copy.ravel(), fuel_copy.ravel(), base.ravel()
+
+    def label(names, copy):
+        names = np.asarray(names, dtype=object)
+        return np.where(copy == 0, names, names + " (" + (copy + 1).astype(str) + ")")
+
+    sectors = label(series['Sector'].to_numpy()[base], sec_copy)
+    fuels = label(series['Fuel'].to_numpy()[base], fuel_copy)
+    order = np.lexsort((base, fuel_copy, sec_copy))  # sector copies as contiguous blocks, like the CSV
+
+    rng = np.random.default_rng(seed)
+    vals = grid.to_numpy()[base[order]][:, year_src]
+    vals = vals * rng.lognormal(0.0, 0.1, size=vals.shape) if scale != 1 else vals
+    keep = present[base[order]][:, year_src]
+    is_marker = marker[base[order]][:, year_src]
+
+    n_series = len(order)
+    out = pd.DataFrame({
+        'Year': np.tile(years, n_series),
+        'Sector': np.repeat(sectors[order], len(years)),
+        'Fuel': np.repeat(fuels[order], len(years)),
+        'Consumption_ktoe': np.where(is_marker, '[x]', np.round(vals, 6).astype(str)).ravel(),
+    })[keep.ravel()]
+    out.to_csv(path, index=False)
+    return len(out)
+
+
+# ---------------- Timing ----------------
+def _timed(fn, repeat=1):
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}, result
+
+
+def _record(results, name, fn, repeat=1):
+    try:
+        results[name], value = _timed(fn, repeat)
+        return value
+    except Exception as exc:  # keep going, the other timings are still useful
+        results[name] = {"error": f"{type(exc).__name__}: {exc}"}
+        return None
+
+
+def bench_helpers(repeat):
+    from analytics import detect_anomalies
+    from chart_export import _figure_for_pdf
+    from energy_cube import ComparisonMatrix, EnergyCube
+    from energy_data import clear_cache, load_energy_data
+    from report import build_pdf_report, compute_compare_summary, make_change_bar
+
+    results = {}
+    clear_cache()  # a fresh process would read the Parquet sidecar, if one was written
+    df = _record(results, "load_data_cache_miss", load_energy_data)
+    sector = df['Sector'].iloc[0]
+    year_a, year_b = int(df['Year'].min()), int(df['Year'].max())
+
+    cube = _record(results, "cube_build", lambda: EnergyCube.from_frame(df), repeat)
+    _record(results, "anomalies_all_series", lambda: detect_anomalies(df), repeat)
+    _record(results, "comparison_matrix_sector", lambda: ComparisonMatrix(cube, sector), repeat)
+    summary = _record(results, "compute_compare_summary",
+                      lambda: compute_compare_summary(df, sector, year_a, year_b), repeat)
+    # first call includes starting the kaleido renderer
+    _record(results, "figure_for_pdf_first",
+            lambda: _figure_for_pdf(make_change_bar(summary, sector, year_a, year_b)))
+    png = _record(results, "figure_for_pdf",
+                  lambda: _figure_for_pdf(make_change_bar(summary, sector, year_a, year_b)), repeat)
+    _record(results, "build_pdf_report",
+            lambda: build_pdf_report(summary, sector, year_a, year_b, png), repeat)
+    return results
+
+
+def bench_app(repeat, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    _record(results, "app_cold_load", at.run)
+    if at.exception:
+        results["app_cold_load"] = {"error": str(at.exception[0].message)}
+        return results
+
+    def widget(kind, label):
+        return next(w for w in getattr(at, kind) if w.label == label)
+
+    def cycle(label):
+        # each call picks the next option, so every run is a real change
+        box = widget("selectbox", label)
+        options = list(box.options)
+        nxt = options[(options.index(str(box.value)) + 1) % len(options)]
+        return lambda: widget("selectbox", label).select(nxt).run()
+
+    for name, label in (("app_sector_change", "Select Sector"),
+                        ("app_year_change", "Select Year"),
+                        ("app_compare_pair_change", "Compare Year A")):
+        runs = []
+        for _ in range(repeat):
+            timing, _ = _timed(cycle(label))
+            runs.extend(timing["runs"])
+        results[name] = {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+    _record(results, "app_pdf_generate_first", lambda: widget("button", "Generate & download PDF").click().run())
+    _record(results, "app_pdf_generate", lambda: widget("button", "Generate & download PDF").click().run(), repeat)
+    if at.exception:
+        results["app_exception"] = str(at.exception[0].message)
+    return results
+
+
+def bench_startup(repeat):
+    """Cold start of the whole script, each run in a new interpreter (imports included)."""
+    runs, loaded = [], set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", _STARTUP_SNIPPET, APP, *DEFERRED_MODULES],
+                              cwd=ROOT, capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            return {"process_cold_start": {"error": proc.stderr.strip().splitlines()[-1]}}
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        runs.append(wall)
+        loaded.update(result["loaded"])
+    return {
+        "process_cold_start": {"min": min(runs), "median": statistics.median(runs), "runs": runs},
+        "deferred_modules_loaded": sorted(loaded),
+    }
+
+
+# ---------------- Orchestration ----------------
+def run_worker(args):
+    """Benchmark one scale in this process (ENERGY_DATA_PATH already points at the data)."""
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    out = {"startup": bench_startup(args.repeat)}
+    # the app goes first so its cold load really is cold (imports, CSV parse, kaleido)
+    if not args.skip_app:
+        out["app"] = bench_app(args.repeat, args.app_timeout)
+    out["helpers"] = bench_helpers(args.repeat)
+    from energy_data import load_energy_data
+    out["rows"] = len(load_energy_data())
+    json.dump(out, sys.stdout)
+
+
+def run_scale(scale, args, workdir):
+    if scale == 1:
+        path = SOURCE_CSV
+    else:
+        path = os.path.join(workdir, f"energy_x{scale}.csv")
+        start = time.perf_counter()
+        rows = synthesize(scale, path)
+        print(f"  x{scale}: {rows:,} synthetic rows ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+    env = dict(os.environ, ENERGY_DATA_PATH=path)
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", "--repeat", str(args.repeat),
+           "--app-timeout", str(args.app_timeout)] + (["--skip-app"] if args.skip_app else [])
+    try:
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=args.scale_timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {args.scale_timeout}s"}
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "worker failed"}
+    return json.loads(proc.stdout)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, tolerance):
+    """List of (scale, group, metric, old, new) medians that regressed beyond ``tolerance``."""
+    regressions = []
+    for scale, groups in current["scales"].items():
+        old_groups = baseline.get("scales", {}).get(scale, {})
+        for group in ("startup", "helpers", "app"):
+            for metric, timing in groups.get(group, {}).items():
+                old = old_groups.get(group, {}).get(metric)
+                if not isinstance(timing, dict) or not isinstance(old, dict):
+                    continue
+                if "median" in timing and "median" in old and timing["median"] > old["median"] * tolerance:
+                    regressions.append((scale, group, metric, old["median"], timing["median"]))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the UK energy dashboard headlessly.")
+    parser.add_argument("--scales", nargs="+", type=int, default=list(DEFAULT_SCALES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timed step (default: %(default)s)")
+    parser.add_argument("--out", default="bench_results.json", help="JSON output (default: %(default)s)")
+    parser.add_argument("--skip-app", action="store_true", help="only benchmark the helpers")
+    parser.add_argument("--app-timeout", type=float, default=600, help="AppTest timeout per run, seconds")
+    parser.add_argument("--scale-timeout", type=float, default=3600, help="wall clock limit per scale, seconds")
+    parser.add_argument("--baseline", help="earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown vs baseline")
+    parser.add_argument("--max-startup", type=float, help="fail when a process cold start takes longer (seconds)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args)
+        return 0
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="energy_bench_") as workdir:
+        for scale in args.scales:
+            print(f"scale x{scale}", file=sys.stderr)
+            report["scales"][str(scale)] = run_scale(scale, args, workdir)
+
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=1)
+    print(f"results -> {os.path.abspath(args.out)}", file=sys.stderr)
+
+    failed = False
+    for scale, groups in report["scales"].items():
+        startup = groups.get("startup", {})
+        if startup.get("deferred_modules_loaded"):
+            print(f"STARTUP x{scale}: page load imported {', '.join(startup['deferred_modules_loaded'])}",
+                  file=sys.stderr)
+            failed = True
+        cold = startup.get("process_cold_start", {})
+        if args.max_startup and cold.get("median", 0) > args.max_startup:
+            print(f"STARTUP x{scale}: cold start {cold['median']:.3f}s > {args.max_startup:.3f}s", file=sys.stderr)
+            failed = True
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(report, baseline, args.tolerance)
+        for scale, group, metric, old, new in regressions:
+            print(f"REGRESSION x{scale} {group}.{metric}: {old:.3f}s -> {new:.3f}s", file=sys.stderr)
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
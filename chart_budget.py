@@ -0,0 +1,131 @@
+"""Point budgets, downsampling and a shared figure cache for the dashboard charts.
+
+Large charts are kept to a fixed number of points before they reach Plotly:
+
+* series and point clouds are thinned per group with Largest-Triangle-Three-
+  Buckets (LTTB), which keeps the peaks and troughs a plain stride would drop;
+* distributions are summarised server-side (quartiles, fences, a capped set
+  of outliers) instead of shipping every point with ``points="all"``.
+
+Traces switch to WebGL once a chart still has more than ``WEBGL_THRESHOLD``
+points. Built figures are kept in a process-wide LRU keyed on the data
+version and the chart's selection, so reruns and other sessions reuse them.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+POINT_BUDGET = int(os.environ.get("ENERGY_POINT_BUDGET", 5000))       # points per chart
+WEBGL_THRESHOLD = int(os.environ.get("ENERGY_WEBGL_THRESHOLD", 1000))  # same cut-off as px's "auto"
+FIGURE_CACHE_SIZE = 64
+
+_figures = OrderedDict()
+_figures_lock = threading.Lock()
+
+
+def render_mode(n_points: int) -> str:
+    """``render_mode`` for px.line / px.scatter."""
+    return "webgl" if n_points > WEBGL_THRESHOLD else "svg"
+
+
+def lttb_indices(x, y, n: int) -> np.ndarray:
+    """Positions of the ``n`` points LTTB keeps from the x-sorted series (x, y)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1])[:max(n, 0)]
+
+    # n-2 buckets between the fixed first and last points
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    keep = np.empty(n, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i == n - 3:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx, cy = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        # twice the area of the triangle (previous pick, candidate, next bucket's mean)
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(frame: pd.DataFrame, x: str, y: str, by, budget: int = POINT_BUDGET) -> pd.DataFrame:
+    """At most ~``budget`` rows of ``frame``, thinned with LTTB within each ``by`` group.
+
+    ``frame`` is returned as is when it fits; otherwise rows with no ``y``
+    are dropped and every group keeps a share of the budget proportional to
+    its size (at least 3 points), in the original row order.
+    """
+    if frame[y].count() <= budget:
+        return frame
+    frame = frame[frame[y].notna()]
+    ordered = frame.reset_index(drop=True).sort_values([*by, x], kind="stable")
+    codes = ordered.groupby(by, sort=False, observed=True).ngroup().to_numpy()
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+    xs, ys = ordered[x].to_numpy(dtype=float), ordered[y].to_numpy(dtype=float)
+
+    keep = []
+    for start, end in zip(starts, ends):
+        share = max(3, int(budget * (end - start) / len(ordered)))
+        keep.append(start + lttb_indices(xs[start:end], ys[start:end], share))
+    rows = ordered.index.to_numpy()[np.concatenate(keep)]   # positions in ``frame``
+    return frame.iloc[np.sort(rows)]
+
+
+def box_summary(frame: pd.DataFrame, by: str, value: str, max_outliers: int = POINT_BUDGET):
+    """Per-group box statistics and a capped frame of outliers.
+
+    Returns ``(stats, outliers)``. ``stats`` has one row per group (source
+    order) with q1/median/q3 and the 1.5×IQR fences clipped to the data,
+    matching what Plotly would draw from the raw points. ``outliers`` holds
+    at most ``max_outliers`` of the points beyond the fences, the most
+    extreme first.
+    """
+    frame = frame[frame[value].notna()]
+    grouped = frame.groupby(by, sort=False, observed=True)[value]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack().reindex(grouped.size().index)
+    stats.columns = ["q1", "median", "q3"]
+    iqr = stats["q3"] - stats["q1"]
+    low = frame[by].map(stats["q1"] - 1.5 * iqr)
+    high = frame[by].map(stats["q3"] + 1.5 * iqr)
+    inside = frame[value].between(low, high)
+    in_range = frame.loc[inside].groupby(by, sort=False, observed=True)[value]
+    stats["lowerfence"] = in_range.min()
+    stats["upperfence"] = in_range.max()
+    stats["count"] = grouped.size()
+
+    outliers = frame.loc[~inside]
+    if len(outliers) > max_outliers:
+        distance = np.maximum(low[~inside] - outliers[value], outliers[value] - high[~inside])
+        outliers = outliers.loc[distance.nlargest(max_outliers).index]
+    return stats.reset_index(), outliers
+
+
+def cached_figure(key, build):
+    """Figure for ``key`` from the shared LRU, building it on a miss.
+
+    ``key`` must include the data version and everything the figure depends
+    on. Cached figures are shared between sessions and must not be mutated.
+    """
+    with _figures_lock:
+        fig = _figures.get(key)
+        if fig is not None:
+            _figures.move_to_end(key)
+            return fig
+    fig = build()
+    with _figures_lock:
+        _figures[key] = fig
+        while len(_figures) > FIGURE_CACHE_SIZE:
+            _figures.popitem(last=False)
+    return fig
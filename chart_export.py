@@ -0,0 +1,131 @@
+"""Static PNG export of Plotly figures through kaleido.
+
+One renderer is kept warm for the whole process and calls into it are
+serialised (the kaleido scope is not thread-safe, and Streamlit runs each
+session in its own thread). Nothing kaleido-related is imported or
+configured until the first export. Rendered PNGs are memoised in a small LRU
+so repeated report requests for the same view skip the headless browser.
+"""
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from instrumentation import timed
+
+PNG_CACHE_SIZE = 128
+_CHROMIUM_ARGS = ("--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu")
+
+_png_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_render_lock = threading.Lock()
+_renderer_ready = False
+
+def _configure_export() -> None:
+    """Point plotly's static export at kaleido with our Chromium flags.
+
+    Done on first export rather than at import: touching ``pio.kaleido``
+    imports kaleido, which is only needed once a PDF is actually requested.
+    """
+    # Unified settings for static maps: PNG, zoom, etc.
+    try:
+        current = dict(getattr(pio.defaults, "to_image", {}) or {})
+        current.setdefault("format", "png")
+        current.setdefault("scale", 2)
+        current["engine"] = "kaleido"
+        current["chromium_args"] = list(_CHROMIUM_ARGS)
+        pio.defaults.to_image = current
+    except Exception:
+        pass  # Some versions don't have defaults.to_image
+
+    # Backward compatibility
+    try:
+        if hasattr(pio, "kaleido") and hasattr(pio.kaleido, "scope"):
+            # Some versions still require this
+            pio.kaleido.scope.chromium_args = _CHROMIUM_ARGS
+            pio.kaleido.scope.default_format = "png"
+            pio.kaleido.scope.default_scale = 2
+    except Exception:
+        pass
+
+
+def _warm_renderer() -> None:
+    """Configure export and start a persistent renderer, once per process.
+
+    kaleido 0.2.x keeps its Chromium subprocess alive on ``pio.kaleido.scope``
+    after the first export; kaleido>=1 launches a browser per call unless a
+    sync server is running, so start one when the API is available.
+    """
+    global _renderer_ready
+    if _renderer_ready:
+        return
+    _configure_export()
+    try:
+        import kaleido
+        start = getattr(kaleido, "start_sync_server", None)
+        if start is not None:
+            start(silence_warnings=True)
+    except Exception:
+        pass
+    _renderer_ready = True
+
+
+@timed()
+def _figure_for_pdf(fig: go.Figure, width=900, height=520, scale=2) -> bytes:
+    """Change the figure to black text on a white background and export it as a PNG (for ReportLab).
+
+    The figure is restyled in place, so pass one built for export.
+    """
+    fig.update_layout(
+        template="plotly_white",
+        paper_bgcolor="white",
+        plot_bgcolor="white",
+        font=dict(color="black"),
+        width=width,
+        height=height,
+        margin=dict(l=40, r=20, t=60, b=40)
+    )
+    # set the axes to black
+    fig.update_xaxes(showgrid=True, gridcolor="#e6e6e6", zeroline=False, color="black")
+    fig.update_yaxes(showgrid=True, gridcolor="#e6e6e6", zeroline=False, color="black")
+    with _render_lock:
+        _warm_renderer()
+        return fig.to_image(format="png", scale=scale)
+
+
+def peek_png(key, width=900, height=520, scale=2):
+    """The memoised PNG for (key, width, height, scale), or None; never renders."""
+    cache_key = (key, width, height, scale)
+    with _cache_lock:
+        png = _png_cache.get(cache_key)
+        if png is not None:
+            _png_cache.move_to_end(cache_key)
+        return png
+
+
+def remember_png(key, png: bytes, width=900, height=520, scale=2) -> None:
+    """Memoise a PNG rendered elsewhere (e.g. by a worker process)."""
+    cache_key = (key, width, height, scale)
+    with _cache_lock:
+        _png_cache[cache_key] = png
+        _png_cache.move_to_end(cache_key)
+        while len(_png_cache) > PNG_CACHE_SIZE:
+            _png_cache.popitem(last=False)
+
+
+def cached_png(key, build_figure, width=900, height=520, scale=2, load=None) -> bytes:
+    """PNG for ``build_figure()``, memoised under (key, width, height, scale).
+
+    On a cache miss ``load()`` is tried first when given (it returns a
+    prerendered PNG or None), then ``build_figure`` is rendered; the least
+    recently used entry is evicted once PNG_CACHE_SIZE images are held.
+    """
+    png = peek_png(key, width, height, scale)
+    if png is not None:
+        return png
+    png = load() if load is not None else None
+    if png is None:
+        png = _figure_for_pdf(build_figure(), width, height, scale)
+    remember_png(key, png, width, height, scale)
+    return png
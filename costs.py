@@ -0,0 +1,162 @@
+"""Price-driven cost estimates for every Sector x Fuel x Year cell.
+
+Prices come from two places and end up in one (Fuel, Year) lookup table:
+
+* ``electricitypricesdataset240725.xlsx`` - monthly electricity system
+  price (p/kWh, a wholesale price), averaged per calendar year (read from
+  the ``ingest.py`` copy while it matches the workbook, else the workbook);
+* ``static_price.xlsx`` - optional manual prices with ``Fuel``, ``Year`` and
+  ``Price_p_per_kWh`` columns; these win over the workbook series.
+
+Gaps inside a fuel's coverage carry the previous year's price; years
+outside it, and fuels with no price at all, fall back to the old flat
+10 p/kWh estimate rather than extrapolating a series decades back. Every
+price is tagged with where it came from so the UI can say so.
+
+Costs are one broadcast of the consumption cube against the price matrix,
+built once per data/price version. ``Total`` rows are the sum of the other
+fuels' costs rather than the total consumption times one price.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from energy_cube import cached_cube
+from energy_data import DATA_PATH, derived
+from instrumentation import timed
+from ingest import SOURCES, load_current, read_sheet, reshape, to_typed
+
+KWH_PER_KTOE = 11_630_000          # 1 ktoe = 11.63 GWh
+DEFAULT_PRICE_P_PER_KWH = 10.0     # legacy flat estimate (£0.10/kWh)
+STATIC_PRICE_PATH = "static_price.xlsx"
+_ELECTRICITY_SPEC = next(s for s in SOURCES if s["name"] == "electricity_system_price_monthly")
+PRICE_FILES = (_ELECTRICITY_SPEC["workbook"], STATIC_PRICE_PATH)
+
+SOURCE_OBSERVED = "observed"
+SOURCE_CARRIED = "previous year"
+SOURCE_DEFAULT = "flat default"
+SOURCE_SUM = "sum of fuels"         # Total rows: no price of their own
+
+
+def _electricity_prices() -> pd.DataFrame:
+    spec = _ELECTRICITY_SPEC
+    monthly = load_current(spec)
+    if monthly is None:
+        # not ingested, or the workbook changed since: parse it here (ingest.py refreshes the copy)
+        monthly = to_typed(reshape(read_sheet(spec), spec), spec["value"], spec["index"])
+    yearly = monthly.groupby(monthly['Date'].dt.year)[spec["value"]].mean().astype(float)
+    return pd.DataFrame({'Fuel': 'Electricity', 'Year': yearly.index.astype(int),
+                         'Price_p_per_kWh': yearly.to_numpy()})
+
+
+def _static_prices(path=STATIC_PRICE_PATH):
+    cols = ['Fuel', 'Year', 'Price_p_per_kWh']
+    try:
+        df = pd.read_excel(path)
+    except (OSError, ValueError):
+        return None
+    if not set(cols) <= set(df.columns):
+        return None  # the shipped sheet is still empty
+    df = df[cols].dropna()
+    df['Year'] = df['Year'].astype(int)
+    return df
+
+
+def load_prices() -> pd.DataFrame:
+    """Observed (Fuel, Year, Price_p_per_kWh); static prices override the workbook."""
+    prices = pd.concat([p for p in (_electricity_prices(), _static_prices()) if p is not None],
+                       ignore_index=True)
+    prices['Fuel'] = prices['Fuel'].astype(str).str.strip()
+    return prices.drop_duplicates(['Fuel', 'Year'], keep='last').reset_index(drop=True)
+
+
+def price_key(fuel: str, priced_fuels) -> str | None:
+    """Priced fuel a consumption fuel is billed at ('Rail - electricity' -> 'Electricity')."""
+    name = fuel.lower()
+    for key in sorted(priced_fuels, key=len, reverse=True):
+        if key.lower() in name:
+            return key
+    return None
+
+
+class CostModel:
+    """Price matrix and cost cube aligned with an ``EnergyCube``."""
+
+    @timed()
+    def __init__(self, cube, prices: pd.DataFrame):
+        self.cube = cube
+        years = cube.years
+        observed = prices.pivot_table(index='Fuel', columns='Year', values='Price_p_per_kWh',
+                                      aggfunc='mean').reindex(columns=years)
+        # carried forward inside each fuel's coverage only
+        filled = observed.ffill(axis=1).where(observed.bfill(axis=1).notna())
+
+        price = np.full((len(cube.fuels), len(years)), DEFAULT_PRICE_P_PER_KWH)
+        source = np.full(price.shape, SOURCE_DEFAULT, dtype=object)
+        is_total = np.array([f.lower() == 'total' for f in cube.fuels], dtype=bool)
+        for f, fuel in enumerate(cube.fuels):
+            if is_total[f]:
+                price[f], source[f] = np.nan, SOURCE_SUM
+                continue
+            key = price_key(fuel, observed.index)
+            if key is None or filled.loc[key].isna().all():
+                continue
+            covered = filled.loc[key].notna().to_numpy()
+            price[f] = np.where(covered, filled.loc[key].to_numpy(), DEFAULT_PRICE_P_PER_KWH)
+            source[f] = np.where(observed.loc[key].notna(), SOURCE_OBSERVED,
+                                 np.where(covered, SOURCE_CARRIED, SOURCE_DEFAULT))
+        self.price = price          # p/kWh, (F, Y)
+        self.price_source = source  # (F, Y)
+
+        # (S, F, Y) x (F, Y) -> £
+        costs = cube.values * KWH_PER_KTOE * price[None] / 100
+        if is_total.any():
+            parts = np.where(cube.present[:, ~is_total], np.nan_to_num(costs[:, ~is_total]), 0.0).sum(axis=1)
+            costs[:, is_total] = np.where(cube.present[:, is_total], parts[:, None], np.nan)
+        self.costs = costs
+
+    def cost_table(self, sector, year) -> pd.DataFrame:
+        """Fuel, consumption, applied price and cost for one sector/year (source row order)."""
+        rows = self.cube.sector_year(sector, year)
+        f = pd.Index(self.cube.fuels).get_indexer(rows['Fuel'])
+        s, y = self.cube.sector_code(sector), self.cube.year_code(year)
+        rows['Price (p/kWh)'] = self.price[f, y]
+        rows['Price source'] = self.price_source[f, y]
+        rows['Cost (£)'] = self.costs[s, f, y]
+        return rows
+
+    def cost_series(self, sector) -> pd.DataFrame:
+        """Long Year / Fuel / Cost (£) frame for one sector, in the trend chart's order."""
+        rows = self.cube.sector_frame(sector)[['Year', 'Fuel']]
+        f = pd.Index(self.cube.fuels).get_indexer(rows['Fuel'])
+        y = pd.Index(self.cube.years).get_indexer(rows['Year'])
+        rows['Cost (£)'] = self.costs[self.cube.sector_code(sector), f, y]
+        return rows
+
+    def compare_costs(self, sector, year_a, year_b) -> pd.DataFrame:
+        """Cost of every fuel present in both years, with the £ and % change."""
+        fuels = self.cube.compare_pair(sector, year_a, year_b)['Fuel']
+        f = pd.Index(self.cube.fuels).get_indexer(fuels)
+        s = self.cube.sector_code(sector)
+        ca = self.costs[s, f, self.cube.year_code(year_a)]
+        cb = self.costs[s, f, self.cube.year_code(year_b)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(ca == 0, np.nan, (cb - ca) / ca * 100)
+        return pd.DataFrame({
+            'Fuel': fuels.to_numpy(),
+            f'Cost_{year_a} (£)': ca,
+            f'Cost_{year_b} (£)': cb,
+            'Change (£)': cb - ca,
+            'Change (%)': pct,
+        })
+
+
+def price_stamp():
+    return tuple((p, os.stat(p).st_mtime_ns) if os.path.exists(p) else (p, None) for p in PRICE_FILES)
+
+
+def cached_costs(path: str = DATA_PATH) -> CostModel:
+    """Cost model for the shared dataset, rebuilt when the data or a price file changes."""
+    return derived(('costs', price_stamp()),
+                   lambda df: CostModel(cached_cube(path), load_prices()), path)
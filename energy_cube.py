@@ -0,0 +1,240 @@
+"""Dense Sector x Fuel x Year cube over the long-format energy frame.
+
+Labels are turned into integer codes once (reusing the codes of categorical
+columns, as held by ``energy_data``), and every view the dashboard
+needs (per-sector series, heatmap pivots, year comparisons) becomes a slice
+or an axis reduction of a NumPy array instead of a boolean mask over the
+whole frame. The input is expected to hold one row per (Sector, Fuel, Year),
+which is what ``preprocess_energy_data.py`` produces.
+"""
+import numpy as np
+import pandas as pd
+
+from energy_data import DATA_PATH, derived
+from instrumentation import timed
+
+
+class EnergyCube:
+    def __init__(self, sectors, fuels, years, values, present, fuel_rank=None):
+        self.sectors = list(sectors)          # sorted
+        self.fuels = list(fuels)              # order of first appearance in the source
+        self.years = [int(y) for y in years]  # sorted
+        self.values = values                  # float64 (S, F, Y), NaN where missing or '[x]'
+        self.present = present                # bool (S, F, Y), True where a row exists
+
+        self._sector_pos = {s: i for i, s in enumerate(self.sectors)}
+        self._year_pos = {y: i for i, y in enumerate(self.years)}
+        # pivot_table orders fuels alphabetically; keep that permutation around
+        self._fuel_sorted = np.argsort(np.asarray(self.fuels, dtype=object), kind='stable')
+        # per-sector fuel order for row views (charts and tables keep the source order)
+        if fuel_rank is None:
+            fuel_rank = np.broadcast_to(np.arange(len(self.fuels)), present.shape[:2])
+        self._sector_fuels = np.argsort(fuel_rank, axis=1, kind='stable')
+        self._comparisons = {}
+        # pivot_table semantics: a present row with NaN sums to 0, an absent one stays NaN
+        self.sums = np.where(present, np.nan_to_num(values), np.nan)
+
+    @classmethod
+    @timed()
+    def from_frame(cls, df: pd.DataFrame) -> "EnergyCube":
+        s_codes, sectors = _codes(df['Sector'], sort=True)
+        f_codes, fuels = _codes(df['Fuel'])
+        y_codes, years = pd.factorize(df['Year'].astype(int), sort=True)
+        keep = (s_codes >= 0) & (f_codes >= 0) & (y_codes >= 0)
+        s_codes, f_codes, y_codes = s_codes[keep], f_codes[keep], y_codes[keep]
+
+        shape = (len(sectors), len(fuels), len(years))
+        consumption = df['Consumption_ktoe'].to_numpy()
+        values = np.full(shape, np.nan)
+        present = np.zeros(shape, dtype=bool)
+        values[s_codes, f_codes, y_codes] = consumption[keep]
+        present[s_codes, f_codes, y_codes] = True
+
+        # row position where each (Sector, Fuel) series first appears
+        fuel_rank = np.full(shape[:2], len(df))
+        np.minimum.at(fuel_rank, (s_codes, f_codes), np.nonzero(keep)[0])
+        return cls(sectors, fuels, years, values, present, fuel_rank)
+
+    # ---------------- lookups ----------------
+    def sector_code(self, sector) -> int:
+        return self._sector_pos[sector]
+
+    def year_code(self, year) -> int:
+        return self._year_pos[int(year)]
+
+    def _year_column(self, s: int, year):
+        """(present, values) over fuels for one sector/year; empty if the year is unknown."""
+        y = self._year_pos.get(int(year))
+        if y is None:
+            return np.zeros(len(self.fuels), dtype=bool), np.full(len(self.fuels), np.nan)
+        return self.present[s, :, y], self.values[s, :, y]
+
+    # ---------------- long-format slices ----------------
+    def sector_frame(self, sector) -> pd.DataFrame:
+        """Rows of one sector, ordered by fuel then year (the CSV order)."""
+        s = self.sector_code(sector)
+        order = self._sector_fuels[s]
+        f_idx, y_idx = np.nonzero(self.present[s, order])
+        f_idx = order[f_idx]
+        return pd.DataFrame({
+            'Year': np.asarray(self.years)[y_idx],
+            'Sector': sector,
+            'Fuel': np.asarray(self.fuels, dtype=object)[f_idx],
+            'Consumption_ktoe': self.values[s, f_idx, y_idx],
+        })
+
+    def sector_year(self, sector, year) -> pd.DataFrame:
+        """Fuel / Consumption_ktoe rows for one sector and year."""
+        s = self.sector_code(sector)
+        present, values = self._year_column(s, year)
+        order = self._sector_fuels[s]
+        keep = order[present[order]]
+        return pd.DataFrame({
+            'Fuel': np.asarray(self.fuels, dtype=object)[keep],
+            'Consumption_ktoe': values[keep],
+        })
+
+    # ---------------- pivots / reductions ----------------
+    def _pivot(self, block, index, columns) -> pd.DataFrame:
+        out = pd.DataFrame(block, index=pd.Index(index, name='Fuel'), columns=columns)
+        return out.dropna(how='all').dropna(axis=1, how='all')
+
+    def fuel_by_sector(self, year) -> pd.DataFrame:
+        """Fuel x Sector totals for one year (same shape as the old pivot_table)."""
+        order = self._fuel_sorted
+        block = self.sums[:, order, self.year_code(year)].T
+        return self._pivot(block, np.asarray(self.fuels, dtype=object)[order],
+                           pd.Index(self.sectors, name='Sector'))
+
+    def fuel_by_year(self, sector) -> pd.DataFrame:
+        """Fuel x Year totals for one sector."""
+        order = self._fuel_sorted
+        block = self.sums[self.sector_code(sector)][order]
+        return self._pivot(block, np.asarray(self.fuels, dtype=object)[order],
+                           pd.Index(self.years, name='Year'))
+
+    # ---------------- comparisons ----------------
+    def comparison(self, sector) -> "ComparisonMatrix":
+        """Year comparisons for one sector, built on first use (O(Fuel x Year))."""
+        matrix = self._comparisons.get(sector)
+        if matrix is None:
+            matrix = self._comparisons[sector] = ComparisonMatrix(self, sector)
+        return matrix
+
+    def compare_pair(self, sector, year_a, year_b) -> pd.DataFrame:
+        """Fuels present in both years with the % change from year_a to year_b."""
+        return self.comparison(sector).pair(year_a, year_b)
+
+    def compare_summary(self, sector, year_a, year_b) -> pd.DataFrame:
+        """Fuels present in either year, missing values as 0, largest change first."""
+        return self.comparison(sector).summary(year_a, year_b)
+
+
+def _codes(column: pd.Series, sort=False):
+    """``pd.factorize`` that reads categorical columns straight from their codes.
+
+    Labels come back sorted, or in order of first appearance when ``sort`` is
+    False, whatever the order of the categories; unused categories are dropped.
+    """
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        codes, labels = pd.factorize(column, sort=sort)
+        return codes, list(labels)
+    codes = column.cat.codes.to_numpy()
+    used = codes >= 0
+    labels = column.cat.categories
+    if sort:
+        seen = np.bincount(codes[used], minlength=len(labels)) > 0
+        rank = np.argsort(np.asarray(labels, dtype=object), kind='stable')
+        rank = rank[seen[rank]]
+    else:
+        rank = pd.unique(codes[used])
+    remap = np.full(len(labels), -1, dtype=np.int64)
+    remap[rank] = np.arange(len(rank))
+    return np.where(used, remap[codes], -1), list(labels[rank])
+
+
+def _pct_change(base, change):
+    # n/a (NaN) on a zero base instead of inf
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(base == 0, np.nan, change / base * 100)
+
+
+class ComparisonMatrix:
+    """Delta and % change between years, per fuel, for one sector.
+
+    Holds only the sector's (Fuel, Year) slice, with missing values counted
+    as 0 like the report summary does: a pair of years is two column reads,
+    and the Year x Year block of ``change_matrix`` is broadcast for the one
+    fuel asked for, so nothing grows with Fuel x Year x Year.
+    """
+
+    @timed()
+    def __init__(self, cube: EnergyCube, sector):
+        self.cube = cube
+        self.sector = sector
+        s = cube.sector_code(sector)
+        order = cube._sector_fuels[s]
+        # only the fuels this sector reports, in source order
+        self.fuel_codes = order[cube.present[s][order].any(axis=1)]
+        self.fuel_names = np.asarray(cube.fuels, dtype=object)[self.fuel_codes]
+        self._fuel_pos = {name: i for i, name in enumerate(self.fuel_names)}
+        self._sorted = np.argsort(self.fuel_names, kind='stable')
+
+        self.present = cube.present[s][self.fuel_codes]    # (F, Y)
+        self.raw = cube.values[s][self.fuel_codes]          # (F, Y), NaN kept
+        self.values = np.nan_to_num(self.raw)               # (F, Y), missing -> 0
+
+    def _year(self, year):
+        return self.cube._year_pos.get(int(year))
+
+    def pair(self, year_a, year_b) -> pd.DataFrame:
+        """Fuels present in both years, source order, raw values (the UI table)."""
+        a, b = self.cube.year_code(year_a), self.cube.year_code(year_b)
+        f = np.flatnonzero(self.present[:, a] & self.present[:, b])
+        va, vb = self.raw[f, a], self.raw[f, b]
+        pct = _pct_change(self.values[f, a], self.values[f, b] - self.values[f, a])
+        return pd.DataFrame({
+            'Fuel': self.fuel_names[f],
+            f'Consumption_ktoe_{year_a}': va,
+            f'Consumption_ktoe_{year_b}': vb,
+            'Change (%)': np.where(np.isnan(va) | np.isnan(vb), np.nan, pct),
+        })
+
+    def summary(self, year_a, year_b) -> pd.DataFrame:
+        """Fuels present in either year, missing values as 0, largest change first."""
+        a, b = self._year(year_a), self._year(year_b)
+        absent = np.zeros(len(self.fuel_names), dtype=bool)
+        pa = self.present[:, a] if a is not None else absent
+        pb = self.present[:, b] if b is not None else absent
+        f = self._sorted[(pa | pb)[self._sorted]]
+        va = self.values[f, a] if a is not None else np.zeros(len(f))
+        vb = self.values[f, b] if b is not None else np.zeros(len(f))
+        change = vb - va
+        pct = _pct_change(va, change)
+        out = pd.DataFrame({
+            'Fuel': self.fuel_names[f],
+            f'Consumption_ktoe_{year_a}': va,
+            f'Consumption_ktoe_{year_b}': vb,
+            'Change_ktoe': change,
+            'Change_%': pct,
+        })
+        return out.sort_values('Change_ktoe', ascending=False).reset_index(drop=True)
+
+    def fuels(self) -> list:
+        """Fuels of this sector in source order."""
+        return list(self.fuel_names)
+
+    def change_matrix(self, fuel, metric='pct') -> pd.DataFrame:
+        """Year A (rows) x Year B (columns) change for one fuel; metric 'pct' or 'delta'."""
+        row = self.values[self._fuel_pos[fuel]]
+        block = row[None, :] - row[:, None]
+        if metric == 'pct':
+            block = _pct_change(row[:, None], block)
+        years = self.cube.years
+        return pd.DataFrame(block, index=pd.Index(years, name='Year A'),
+                            columns=pd.Index(years, name='Year B'))
+
+
+def cached_cube(path: str = DATA_PATH) -> EnergyCube:
+    """The cube for the shared dataset, built once per data version."""
+    return derived(('cube',), EnergyCube.from_frame, path)
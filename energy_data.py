@@ -0,0 +1,196 @@
+"""Process-wide data layer for the standardized energy dataset.
+
+The CSV is parsed and cleaned once per process and the resulting frame is
+shared by every Streamlit session. Entries are invalidated when the file's
+mtime/size changes *and* its content hash differs. A Parquet sidecar written
+next to the CSV lets a cold process skip CSV parsing altogether.
+
+The frame is held in a compact layout (``COMPACT_DTYPES``): categorical
+Sector/Fuel (categories in order of first appearance), int16 Year, float64
+Consumption_ktoe (the CSV holds up to 17 significant digits, which float32
+would round away) and a boolean ``Missing`` column marking the '[x]' cells,
+whose value is NaN. The sidecar keeps these dtypes.
+"""
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from instrumentation import timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # the sidecar is an optimisation, not a requirement
+    pa = None
+    pq = None
+
+# ENERGY_DATA_PATH points the app at another standardized CSV (e.g. benchmark data)
+DATA_PATH = os.environ.get("ENERGY_DATA_PATH", "Standardized_Energy_Data.csv")
+_HASH_KEY = b"source_sha256"
+_LAYOUT_KEY = b"layout"
+_LAYOUT = b"compact-2"   # bump when the in-memory layout changes; old sidecars are rebuilt
+
+COMPACT_DTYPES = {
+    "Year": "int16",
+    "Sector": "category",
+    "Fuel": "category",
+    "Consumption_ktoe": "float64",
+    "Missing": "bool",
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _sidecar_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def _category(column: pd.Series) -> pd.Series:
+    # categories in order of first appearance, so legends and tables keep the source order
+    column = column.astype("category")
+    codes = column.cat.codes.to_numpy()
+    seen = pd.unique(codes[codes >= 0])
+    return column.cat.reorder_categories(column.cat.categories[seen]).cat.remove_unused_categories()
+
+
+def compact_frame(df: pd.DataFrame, index="Year", value="Consumption_ktoe") -> pd.DataFrame:
+    """Long frame -> compact dtypes, with non-numeric values ('[x]') as NaN plus a ``Missing`` mask.
+
+    ``index`` is narrowed to int16 when it holds years; other index columns
+    (e.g. dates) are left alone.
+    """
+    numeric = pd.to_numeric(df[value], errors="coerce")
+    out = pd.DataFrame({
+        index: df[index],
+        "Sector": _category(df["Sector"]),
+        "Fuel": _category(df["Fuel"]),
+        value: numeric,
+        "Missing": numeric.isna().to_numpy(),
+    })
+    # COMPACT_DTYPES names the dashboard's columns; ``index``/``value`` take the Year/Consumption_ktoe roles
+    roles = {"Year": index, "Consumption_ktoe": value}
+    dtypes = {roles.get(col, col): dtype for col, dtype in COMPACT_DTYPES.items()
+              if col != "Year" or index == "Year"}
+    return out.astype(dtypes).reset_index(drop=True)
+
+
+def clean_energy_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Turn the '[x]' markers into NaN and store the frame in the compact layout."""
+    return compact_frame(df)
+
+
+def _read_sidecar(sidecar: str, data_hash: str):
+    if pq is None or not os.path.exists(sidecar):
+        return None
+    try:
+        table = pq.read_table(sidecar)
+    except Exception:
+        return None
+    meta = table.schema.metadata or {}
+    if meta.get(_HASH_KEY, b"").decode() != data_hash or meta.get(_LAYOUT_KEY) != _LAYOUT:
+        return None
+    return table.to_pandas()
+
+
+def _write_sidecar(df: pd.DataFrame, sidecar: str, data_hash: str) -> None:
+    if pa is None:
+        return
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        meta = dict(table.schema.metadata or {})
+        meta[_HASH_KEY] = data_hash.encode()
+        meta[_LAYOUT_KEY] = _LAYOUT
+        tmp = sidecar + ".tmp"
+        pq.write_table(table.replace_schema_metadata(meta), tmp)
+        os.replace(tmp, sidecar)
+    except OSError:
+        pass  # read-only deployments still work, just without the sidecar
+
+
+def _load_entry(path: str) -> dict:
+    path = os.path.abspath(path)
+    info = os.stat(path)
+    stamp = (info.st_mtime_ns, info.st_size)
+    entry = _cache.get(path)
+    if entry is not None and entry["stamp"] == stamp:
+        return entry
+
+    with _lock:
+        entry = _cache.get(path)
+        if entry is not None and entry["stamp"] == stamp:
+            return entry
+        data_hash = _file_hash(path)
+        if entry is not None and entry["version"] == data_hash:
+            # touched but not modified
+            entry = dict(entry, stamp=stamp)
+            _cache[path] = entry
+            return entry
+
+        sidecar = _sidecar_path(path)
+        df = _read_sidecar(sidecar, data_hash)
+        if df is None:
+            # labels parse straight into categoricals instead of one str object per row
+            df = clean_energy_frame(pd.read_csv(path, dtype={"Sector": "category", "Fuel": "category",
+                                                             "Consumption_ktoe": str}))
+            _write_sidecar(df, sidecar, data_hash)
+        entry = {"stamp": stamp, "version": data_hash, "df": df, "derived": {}}
+        _cache[path] = entry
+        return entry
+
+
+@timed()
+def load_energy_data(path: str = DATA_PATH) -> pd.DataFrame:
+    """Return the cleaned long-format frame (Year, Sector, Fuel, Consumption_ktoe, Missing).
+
+    The frame is shared across sessions: treat it as read-only and ``copy()``
+    before modifying it.
+    """
+    return _load_entry(path)["df"]
+
+
+def data_version(path: str = DATA_PATH) -> str:
+    """Content hash of the dataset currently held in memory."""
+    return _load_entry(path)["version"]
+
+
+def derived(key, build, path: str = DATA_PATH):
+    """Memoise ``build(df)`` under ``key`` for the current data version.
+
+    Derived results live on the cache entry, so they are dropped together
+    with the frame when the underlying file changes.
+    """
+    entry = _load_entry(path)
+    cache = entry["derived"]
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    value = build(entry["df"])
+    cache[key] = value  # a concurrent duplicate build is harmless
+    return value
+
+
+def write_compact(path: str = DATA_PATH):
+    """Write the typed Parquet copy of ``path`` (the sidecar) and return its path.
+
+    Returns None when pyarrow is not installed.
+    """
+    _load_entry(path)  # loading writes the sidecar when it is missing or stale
+    sidecar = _sidecar_path(path)
+    return sidecar if pa is not None and os.path.exists(sidecar) else None
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
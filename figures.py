@@ -0,0 +1,173 @@
+"""Figure builders for the dashboard's charts, shared with the snapshot bake.
+
+Each builder takes the chart's selection (its dependencies) and the data
+path, and reads everything else from the process-wide caches. ``FIGURES`` /
+``TABLES`` map the names the dashboard and ``snapshot.py`` use to the
+builders, called as ``FIGURES[name](*deps, path=path)``.
+"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+from analytics import cached_anomalies
+from chart_budget import box_summary, downsample, render_mode
+from costs import cached_costs
+from energy_cube import cached_cube
+from energy_data import DATA_PATH, load_energy_data
+from forecast import MODELS, cached_forecasts
+
+
+# ---------------- Line Chart with Anomaly Highlight ----------------
+def trend_figure(sector, window, threshold, budget, model, horizon, path=DATA_PATH):
+    # Slices of the precomputed Sector×Fuel×Year cube instead of masks over df,
+    # thinned per fuel (LTTB) when the sector has more points than the budget
+    df_sector = downsample(cached_cube(path).sector_frame(sector), "Year", "Consumption_ktoe", ["Fuel"], budget)
+    mode = render_mode(len(df_sector))
+    # Precomputed for every (Sector, Fuel) series, cached per data version
+    anomalies = cached_anomalies(window, threshold, path)
+    highlight = anomalies[anomalies['Sector'] == sector]
+
+    fig1 = px.line(df_sector, x="Year", y="Consumption_ktoe", color="Fuel",
+                   title=f"{sector}: Energy Consumption Trend by Fuel (1970–2023)",
+                   markers=True, render_mode=mode)
+    # One batched marker trace for all anomalies
+    marker_trace = go.Scattergl if mode == "webgl" else go.Scatter
+    fig1.add_trace(marker_trace(
+        x=highlight['Year'], y=highlight['Consumption_ktoe'],
+        mode='markers',
+        marker=dict(color='red', size=12, symbol='triangle-up'),
+        name='Anomaly',
+        showlegend=False,
+        customdata=highlight[['Fuel']],
+        hovertemplate="Fuel=%{customdata[0]}<br>Year=%{x}<br>Consumption=%{y:.0f} ktoe"
+    ))
+
+    if model is not None:
+        # Dashed continuation of each fuel's line, in the fuel's colour
+        projected = cached_forecasts(horizon, path).sector_paths(sector, model)
+        colors = {t.name: t.line.color for t in fig1.data if t.name in set(projected['Fuel'])}
+        for fuel, rows in projected.groupby('Fuel', sort=False):
+            fig1.add_trace(marker_trace(
+                x=rows['Year'], y=rows['Consumption_ktoe'], mode='lines',
+                line=dict(color=colors.get(fuel), dash='dash'),
+                name=f"{fuel} (projected)", legendgroup=fuel, showlegend=False,
+                hovertemplate=f"Fuel={fuel}<br>Year=%{{x}}<br>Projected=%{{y:.0f}} ktoe<extra>{MODELS[model]}</extra>"
+            ))
+
+    fig1.update_layout(paper_bgcolor='black', plot_bgcolor='black', font_color='white')
+    return fig1
+
+
+# ---------------- Heatmap + Radar Chart ----------------
+def heatmap_figure(year, path=DATA_PATH):
+    pivot_heat = cached_cube(path).fuel_by_sector(year)
+    fig_heat = px.imshow(pivot_heat, text_auto=True, color_continuous_scale='YlOrRd',
+                         title=f"Heatmap: Sector vs Fuel ({year})")
+    fig_heat.update_layout(paper_bgcolor='black', font_color='white')
+    return fig_heat
+
+
+def radar_figure(sector, year, path=DATA_PATH):
+    radar_df = cached_cube(path).sector_year(sector, year).dropna()
+    fig_radar = go.Figure()
+    fig_radar.add_trace(go.Scatterpolar(
+        r=radar_df['Consumption_ktoe'],
+        theta=radar_df['Fuel'],
+        fill='toself',
+        name='Fuel Share'
+    ))
+    fig_radar.update_layout(
+        polar=dict(radialaxis=dict(visible=True)),
+        showlegend=False,
+        title="Radar Chart: Fuel Composition",
+        paper_bgcolor='black', font_color='white'
+    )
+    return fig_radar
+
+
+# ---------------- Scatter + Box Chart ----------------
+def scatter_figure(budget, path=DATA_PATH):
+    df = load_energy_data(path)
+    points = downsample(df, "Year", "Consumption_ktoe", ["Sector"], budget)
+    title = "All Sectors: Consumption over Time"
+    if len(points) < df['Consumption_ktoe'].count():
+        title += f" ({len(points):,} of {df['Consumption_ktoe'].count():,} points)"
+    fig_scatter = px.scatter(points, x="Year", y="Consumption_ktoe", color="Sector", hover_data=["Fuel"],
+                             title=title, render_mode=render_mode(len(points)))
+    fig_scatter.update_layout(paper_bgcolor='black', plot_bgcolor='black', font_color='white')
+    return fig_scatter
+
+
+def box_figure(sector, budget, path=DATA_PATH):
+    df_sector = cached_cube(path).sector_frame(sector)
+    title = f"Box Plot: {sector} Fuel Distribution (1970–2023)"
+    if df_sector['Consumption_ktoe'].count() <= budget:
+        fig_box = px.box(df_sector, x="Fuel", y="Consumption_ktoe", points="all", title=title)
+    else:
+        # Quartiles and fences computed here; only (the most extreme) outliers are sent
+        stats, outliers = box_summary(df_sector, "Fuel", "Consumption_ktoe", max_outliers=budget)
+        fig_box = go.Figure(go.Box(
+            x=stats['Fuel'], q1=stats['q1'], median=stats['median'], q3=stats['q3'],
+            lowerfence=stats['lowerfence'], upperfence=stats['upperfence'],
+            name='Consumption_ktoe', showlegend=False,
+        ))
+        fig_box.add_trace(go.Scattergl(
+            x=outliers['Fuel'], y=outliers['Consumption_ktoe'], mode='markers',
+            marker=dict(size=4), name='Outliers', showlegend=False,
+            customdata=outliers[['Year']],
+            hovertemplate="Fuel=%{x}<br>Year=%{customdata[0]}<br>Consumption=%{y:.0f} ktoe",
+        ))
+        fig_box.update_layout(title=title, xaxis_title="Fuel", yaxis_title="Consumption_ktoe")
+    fig_box.update_layout(paper_bgcolor='black', plot_bgcolor='black', font_color='white')
+    return fig_box
+
+
+# ---------------- Yearly Calendar Heatmap ----------------
+def calendar_figure(sector, path=DATA_PATH):
+    pivot_year = cached_cube(path).fuel_by_year(sector)
+    fig_year = px.imshow(pivot_year, color_continuous_scale='Viridis',
+                         title=f"{sector} - Yearly Fuel Usage")
+    fig_year.update_layout(paper_bgcolor='black', font_color='white')
+    return fig_year
+
+
+# ---------------- Cost Estimation ----------------
+def cost_figure(sector, budget, path=DATA_PATH):
+    series = downsample(cached_costs(path).cost_series(sector), "Year", "Cost (£)", ["Fuel"], budget)
+    fig_cost = px.line(series, x="Year", y="Cost (£)", color="Fuel",
+                       title=f"{sector}: Estimated Cost by Fuel (1970–2023)", render_mode=render_mode(len(series)))
+    fig_cost.update_layout(paper_bgcolor='black', plot_bgcolor='black', font_color='white')
+    return fig_cost
+
+
+def cost_table(sector, year, path=DATA_PATH):
+    # Per-(Fuel, Year) prices joined onto the whole cube once per data version
+    return cached_costs(path).cost_table(sector, year)
+
+
+# ---------------- Change Matrix ----------------
+def matrix_figure(sector, fuel, path=DATA_PATH):
+    change_matrix = cached_cube(path).comparison(sector).change_matrix(fuel)
+    abs_change = np.abs(change_matrix.to_numpy())
+    abs_change = abs_change[np.isfinite(abs_change)]
+    bound = float(np.percentile(abs_change, 95)) if abs_change.size else 1.0  # keep small-base outliers from washing out the scale
+    fig_matrix = px.imshow(change_matrix, color_continuous_scale='RdBu_r', zmin=-bound, zmax=bound,
+                           labels=dict(color="Change %"),
+                           title=f"{sector} - {fuel}: Change % from Year A to Year B")
+    fig_matrix.update_layout(paper_bgcolor='black', font_color='white')
+    return fig_matrix
+
+
+FIGURES = {
+    "trend": trend_figure,
+    "heatmap": heatmap_figure,
+    "radar": radar_figure,
+    "scatter": scatter_figure,
+    "box": box_figure,
+    "calendar": calendar_figure,
+    "cost": cost_figure,
+    "matrix": matrix_figure,
+}
+TABLES = {
+    "cost_table": cost_table,
+}
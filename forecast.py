@@ -0,0 +1,146 @@
+"""Batched projections for every Sector x Fuel series of an ``EnergyCube``.
+
+All series are fitted at once over the Year axis of the cube:
+
+* ``linear`` - least squares y = a + b*t on the last ``FIT_WINDOW`` years;
+* ``log-linear`` - the same fit on log(y), i.e. a constant growth rate;
+* ``exp-smoothing`` - Holt's linear-trend exponential smoothing.
+
+The regressions solve one 2x2 system per series with a single batched
+``np.linalg.solve``, and smoothing steps through the years with every
+series updated in the same array operation, so the cost does not depend on
+the number of series in Python terms. Only series with a value in the last
+data year and at least ``MIN_POINTS`` values in the window are projected;
+projections are clipped at 0 ktoe.
+"""
+import numpy as np
+import pandas as pd
+
+from energy_cube import cached_cube
+from energy_data import DATA_PATH, derived
+from instrumentation import timed
+
+MODELS = {
+    "linear": "Linear trend",
+    "log-linear": "Log-linear (constant growth)",
+    "exp-smoothing": "Exponential smoothing (Holt)",
+}
+DEFAULT_MODEL = "linear"
+DEFAULT_HORIZON = 7       # years past the last data year
+MAX_HORIZON = 15
+FIT_WINDOW = 15           # years of history the models see
+MIN_POINTS = 4
+SMOOTHING_ALPHA = 0.5     # level
+SMOOTHING_BETA = 0.3      # trend
+
+
+def _regression(t, y, ok):
+    """Per-series (intercept, slope) of y on t over the ``ok`` cells; NaN if underdetermined."""
+    w = ok.astype(float)
+    y = np.where(ok, y, 0.0)
+    # normal equations X'WX b = X'Wy with X = [1, t], one 2x2 system per series
+    s0, s1, s2 = w.sum(axis=1), (w * t).sum(axis=1), (w * t * t).sum(axis=1)
+    lhs = np.stack([np.stack([s0, s1], -1), np.stack([s1, s2], -1)], -2)          # (N, 2, 2)
+    rhs = np.stack([(w * y).sum(axis=1), (w * t * y).sum(axis=1)], -1)          # (N, 2)
+    solvable = np.abs(np.linalg.det(lhs)) > 1e-9
+    coef = np.full(rhs.shape, np.nan)
+    if solvable.any():
+        coef[solvable] = np.linalg.solve(lhs[solvable], rhs[solvable][..., None])[..., 0]
+    return coef[:, 0], coef[:, 1]
+
+
+def _holt(y, ok, steps, alpha=SMOOTHING_ALPHA, beta=SMOOTHING_BETA):
+    """Holt's smoothing over the year axis, all series at once; returns (N, steps)."""
+    n, length = y.shape
+    level = np.full(n, np.nan)
+    trend = np.zeros(n)
+    for k in range(length):
+        obs, fresh = ok[:, k], ok[:, k] & np.isnan(level)
+        level[fresh] = y[fresh, k]
+        upd = obs & ~fresh
+        prev = level[upd]
+        level[upd] = alpha * y[upd, k] + (1 - alpha) * (prev + trend[upd])
+        trend[upd] = beta * (level[upd] - prev) + (1 - beta) * trend[upd]
+        # a gap carries the trend forward
+        gap = ~obs & ~np.isnan(level)
+        level[gap] += trend[gap]
+    return level[:, None] + trend[:, None] * np.arange(1, steps + 1)
+
+
+class Forecasts:
+    """Projections of every (Sector, Fuel) series of ``cube`` for each model."""
+
+    @timed()
+    def __init__(self, cube, horizon=DEFAULT_HORIZON, window=FIT_WINDOW):
+        self.cube = cube
+        last = cube.years[-1]
+        self.years = list(range(last + 1, last + horizon + 1))
+        hist_years = np.asarray(cube.years)
+        cols = np.flatnonzero(hist_years > last - window)
+
+        shape = cube.values.shape[:2]
+        y = cube.values[:, :, cols].astype(float).reshape(-1, len(cols))       # (N, W)
+        ok = cube.present[:, :, cols].reshape(-1, len(cols)) & ~np.isnan(y)
+        t = (hist_years[cols] - last).astype(float)[None]                     # 0 at the last year
+        ahead = np.arange(1, horizon + 1, dtype=float)[None]
+
+        # projectable: still reported in the last year, with enough history
+        self.valid = (ok[:, -1] & (ok.sum(axis=1) >= MIN_POINTS)).reshape(shape)
+        self.last_value = np.where(ok[:, -1], y[:, -1], np.nan).reshape(shape)
+
+        paths = {}
+        a, b = _regression(t, y, ok)
+        paths["linear"] = a[:, None] + b[:, None] * ahead
+        positive = ok & (y > 0)
+        la, lb = _regression(t, np.log(np.where(positive, y, 1.0)), positive)
+        paths["log-linear"] = np.exp(la[:, None] + lb[:, None] * ahead)
+        paths["exp-smoothing"] = _holt(y, ok, horizon)
+
+        self.paths = {}
+        for model, path in paths.items():
+            path = np.clip(path, 0, None).reshape(*shape, horizon)
+            self.paths[model] = np.where(self.valid[..., None] & np.isfinite(path), path, np.nan)
+
+    def sector_paths(self, sector, model=DEFAULT_MODEL) -> pd.DataFrame:
+        """Long Year / Fuel / Consumption_ktoe projection rows for one sector.
+
+        Each projected fuel starts with its last actual point, so a chart can
+        draw the projection as a continuation of the history.
+        """
+        s = self.cube.sector_code(sector)
+        order = self.cube._sector_fuels[s]
+        f = order[self.valid[s, order]]
+        path = self.paths[model][s, f]
+        ok = ~np.isnan(path)
+        years = np.asarray([self.cube.years[-1]] + self.years)
+        block = np.concatenate([self.last_value[s, f][:, None], path], axis=1)
+        keep = np.concatenate([np.ones((len(f), 1), dtype=bool), ok], axis=1) & ok.any(axis=1)[:, None]
+        rows, cols = np.nonzero(keep)
+        return pd.DataFrame({
+            'Year': years[cols],
+            'Fuel': np.asarray(self.cube.fuels, dtype=object)[f][rows],
+            'Consumption_ktoe': block[rows, cols],
+        })
+
+    def outlook(self, sector, model=DEFAULT_MODEL, year=None) -> pd.DataFrame:
+        """Last actual value and the projection for ``year`` (default: the horizon end) per fuel."""
+        year = self.years[-1] if year is None else year
+        h = self.years.index(year)
+        s = self.cube.sector_code(sector)
+        order = self.cube._sector_fuels[s]
+        f = order[self.valid[s, order]]
+        last, projected = self.last_value[s, f], self.paths[model][s, f, h]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(last == 0, np.nan, (projected - last) / last * 100)
+        out = pd.DataFrame({
+            'Fuel': np.asarray(self.cube.fuels, dtype=object)[f],
+            f'Consumption_ktoe_{self.cube.years[-1]}': last,
+            f'Projected_ktoe_{year}': projected,
+            'Change_%': pct,
+        })
+        return out[~np.isnan(projected)].reset_index(drop=True)
+
+
+def cached_forecasts(horizon: int = DEFAULT_HORIZON, path: str = DATA_PATH) -> Forecasts:
+    """Projections for the shared dataset, fitted once per data version and horizon."""
+    return derived(('forecasts', int(horizon)), lambda df: Forecasts(cached_cube(path), int(horizon)), path)
@@ -0,0 +1,250 @@
+"""Declarative, incremental ingestion of the source Excel workbooks.
+
+Each entry of ``SOURCES`` names a workbook sheet and how it is laid out:
+
+* ``"blocks"`` - the ECUK style used by Table C1/C2/C4: several tables side by
+  side, each starting with a ``Year`` column, with the table title (the
+  sector) in the row above the header row.
+* ``"wide"`` - a single table whose first column is the index (Year/Date)
+  and whose other columns are series; ``sector`` gives the label to use.
+
+Sheets are reshaped with array operations only (one column-major ravel per
+sheet, no per-cell Python loop) and written as Parquet files to ``out_dir``
+in the same compact layout the dashboard holds in memory (categorical
+labels, float64 values with a ``Missing`` mask, int16 years). A manifest keeps the checksum of every sheet's raw cells and of
+its spec, so a re-run only reshapes sheets whose content or spec changed.
+
+    python ingest.py                 # refresh everything that changed
+    python ingest.py --force table_c1_2023   # or --force alone for all
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from energy_data import compact_frame
+
+OUT_DIR = "ingested"
+MANIFEST_NAME = "manifest.json"
+SCHEMA = "compact-2"   # output dtypes; outputs written under another schema are rebuilt
+
+SOURCES = [
+    {"name": "table_c1_2023", "workbook": "TableC2023.xlsx", "sheet": 0,
+     "layout": "blocks", "header_row": 5},
+    {"name": "ecuk_c1_sector_fuel", "workbook": "ECUK_2024_Consumption_tables.xlsx", "sheet": "Table C1",
+     "layout": "blocks", "header_row": 5},
+    {"name": "ecuk_c2_industry_subsector", "workbook": "ECUK_2024_Consumption_tables.xlsx", "sheet": "Table C2",
+     "layout": "blocks", "header_row": 5},
+    {"name": "ecuk_c4_services_subsector", "workbook": "ECUK_2024_Consumption_tables.xlsx", "sheet": "Table C4",
+     "layout": "blocks", "header_row": 4},
+    {"name": "ecuk_c5_temperature_by_sector", "workbook": "ECUK_2024_Consumption_tables.xlsx", "sheet": "Table C5",
+     "layout": "wide", "header_row": 3, "sector": "Temperature corrected"},
+    {"name": "electricity_system_price_monthly", "workbook": "electricitypricesdataset240725.xlsx",
+     "sheet": "Table 2 Monthly", "layout": "wide", "header_row": 4, "sector": "Electricity system price",
+     "index": "Date", "value": "Price_p_per_kWh"},
+]
+
+_NOTE_RE = re.compile(r"\s*\[Note \d+\]")
+
+
+def clean_label(value) -> str:
+    """'Coke and breeze\\n[Note 2]' -> 'Coke and breeze'."""
+    return " ".join(_NOTE_RE.sub("", str(value)).split())
+
+
+def _columns(raw: pd.DataFrame, header_row: int):
+    header = raw.iloc[header_row]
+    data = raw.iloc[header_row + 1:].reset_index(drop=True)
+    # per-column dtype inference, as a header= read would do
+    return header, data.infer_objects()
+
+
+def reshape_blocks(raw: pd.DataFrame, header_row: int, index="Year", value="Consumption_ktoe") -> pd.DataFrame:
+    """Side-by-side ``Year | fuel | fuel ...`` blocks -> long (Year, Sector, Fuel, value).
+
+    ``raw`` is the sheet read with ``header=None``; ``header_row`` is the
+    0-based row holding the ``Year`` / fuel headers. Rows with no index or no
+    value are dropped; markers such as '[x]' are kept as they are.
+    """
+    header, data = _columns(raw, header_row)
+    labels = header.map(lambda v: clean_label(v) if pd.notna(v) else None).to_numpy(dtype=object)
+    titles = raw.iloc[header_row - 1].ffill().map(clean_label).to_numpy(dtype=object)
+
+    is_index = labels == index
+    block = np.cumsum(is_index) - 1                      # block number of every column
+    index_col = np.flatnonzero(is_index)                 # column position of each block's Year
+    value_cols = np.flatnonzero((block >= 0) & ~is_index & (labels != None))  # noqa: E711
+    return _melt(data, index_col[block[value_cols]], value_cols,
+                 titles[value_cols], labels[value_cols], index, value)
+
+
+def reshape_wide(raw: pd.DataFrame, header_row: int, sector: str, index="Year",
+                 value="Consumption_ktoe") -> pd.DataFrame:
+    """One index column followed by series columns -> long (index, Sector, Fuel, value)."""
+    header, data = _columns(raw, header_row)
+    labels = header.map(lambda v: clean_label(v) if pd.notna(v) else None).to_numpy(dtype=object)
+    named = np.flatnonzero(labels != None)  # noqa: E711
+    index_col, value_cols = named[0], named[1:]
+    return _melt(data, np.full(len(value_cols), index_col), value_cols,
+                 np.full(len(value_cols), sector, dtype=object), labels[value_cols], index, value)
+
+
+def _melt(data, index_cols, value_cols, sectors, fuels, index, value) -> pd.DataFrame:
+    n = len(data)
+    # (rows x series) -> column-major ravel keeps the series-by-series order
+    idx = data.iloc[:, index_cols].to_numpy(dtype=object).ravel(order="F")
+    vals = data.iloc[:, value_cols].to_numpy(dtype=object).ravel(order="F")
+    out = pd.DataFrame({
+        index: idx,
+        "Sector": np.repeat(np.asarray(sectors, dtype=object), n),
+        "Fuel": np.repeat(np.asarray(fuels, dtype=object), n),
+        value: vals,
+    })
+    if index == "Year":
+        out[index] = pd.to_numeric(out[index], errors="coerce")
+    else:
+        out[index] = pd.to_datetime(out[index], errors="coerce")
+    out = out[out[index].notna() & out[value].notna()].reset_index(drop=True)
+    if index == "Year":
+        out[index] = out[index].astype(int)
+    return out
+
+
+def read_sheet(spec: dict, book=None) -> pd.DataFrame:
+    return pd.read_excel(book if book is not None else spec["workbook"], sheet_name=spec["sheet"], header=None)
+
+
+def reshape(raw: pd.DataFrame, spec: dict) -> pd.DataFrame:
+    index, value = spec.get("index", "Year"), spec.get("value", "Consumption_ktoe")
+    if spec["layout"] == "blocks":
+        return reshape_blocks(raw, spec["header_row"], index, value)
+    if spec["layout"] == "wide":
+        return reshape_wide(raw, spec["header_row"], spec["sector"], index, value)
+    raise ValueError(f"unknown layout {spec['layout']!r} for {spec['name']}")
+
+
+def to_typed(long_df: pd.DataFrame, value="Consumption_ktoe", index="Year") -> pd.DataFrame:
+    """Compact dtypes ready for Parquet: categorical labels, float64 values
+    ('[x]' -> NaN, flagged in ``Missing``) and int16 years."""
+    return compact_frame(long_df, index, value)
+
+
+def _checksum(raw: pd.DataFrame, spec: dict) -> str:
+    h = hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode())
+    h.update(pd.util.hash_pandas_object(raw.astype(str), index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _file_stamp(path: str) -> list:
+    info = os.stat(path)
+    return [info.st_mtime_ns, info.st_size]
+
+
+def _spec_key(spec: dict) -> str:
+    return json.dumps(spec, sort_keys=True, default=str)
+
+
+def _load_manifest(manifest_path: str) -> dict:
+    try:
+        with open(manifest_path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def ingest(sources=SOURCES, out_dir=OUT_DIR, force=(), log=print) -> dict:
+    """Refresh the Parquet output of every source whose content changed.
+
+    ``force`` is a collection of source names to rebuild regardless. Returns
+    ``{name: "updated" | "unchanged"}``.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    manifest = _load_manifest(manifest_path)
+
+    status = {}
+    books = {}
+    for spec in sources:
+        name = spec["name"]
+        out_path = os.path.join(out_dir, f"{name}.parquet")
+        prev = manifest.get(name, {})
+        stamp = _file_stamp(spec["workbook"])
+        spec_key = _spec_key(spec)
+        # untouched workbook and spec: nothing to read at all
+        current = prev.get("schema") == SCHEMA and os.path.exists(out_path)
+        if (name not in force and current
+                and prev.get("stamp") == stamp and prev.get("spec") == spec_key):
+            status[name] = "unchanged"
+            continue
+
+        if spec["workbook"] not in books:
+            books[spec["workbook"]] = pd.ExcelFile(spec["workbook"])
+        raw = read_sheet(spec, books[spec["workbook"]])
+        checksum = _checksum(raw, spec)
+        if name not in force and current and prev.get("checksum") == checksum:
+            status[name] = "unchanged"
+        else:
+            typed = to_typed(reshape(raw, spec), spec.get("value", "Consumption_ktoe"), spec.get("index", "Year"))
+            # written aside and swapped in, so a dashboard reading the copy never sees half a file
+            typed.to_parquet(out_path + ".tmp", index=False)
+            os.replace(out_path + ".tmp", out_path)
+            status[name] = "updated"
+            log(f"{name}: {len(typed):,} rows -> {out_path}")
+        manifest[name] = {"stamp": stamp, "spec": spec_key, "checksum": checksum, "schema": SCHEMA}
+
+    for book in books.values():
+        book.close()
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    os.replace(tmp, manifest_path)
+    return status
+
+
+def load_ingested(name: str, out_dir=OUT_DIR) -> pd.DataFrame:
+    return pd.read_parquet(os.path.join(out_dir, f"{name}.parquet"))
+
+
+def load_current(spec: dict, out_dir=OUT_DIR):
+    """The ingested copy of ``spec`` if the manifest says it matches the workbook, else None.
+
+    Read-only, for serving processes: refreshing the copy is left to ``ingest()``.
+    """
+    entry = _load_manifest(os.path.join(out_dir, MANIFEST_NAME)).get(spec["name"], {})
+    try:
+        stamp = _file_stamp(spec["workbook"])
+    except OSError:
+        return None
+    if entry.get("schema") != SCHEMA or entry.get("stamp") != stamp or entry.get("spec") != _spec_key(spec):
+        return None
+    try:
+        return load_ingested(spec["name"], out_dir)
+    except (OSError, ValueError):  # missing or unreadable (pyarrow's ArrowInvalid is a ValueError)
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Ingest the ECUK / price workbooks into typed Parquet files.")
+    parser.add_argument("--out", default=OUT_DIR, help="output directory (default: %(default)s)")
+    parser.add_argument("--force", nargs="*", default=None, metavar="NAME",
+                        help="rebuild the named sources (all when no name is given)")
+    args = parser.parse_args(argv)
+
+    names = [s["name"] for s in SOURCES]
+    force = names if args.force == [] else (args.force or [])
+    unknown = set(force) - set(names)
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(sorted(unknown))}")
+    status = ingest(SOURCES, args.out, set(force))
+    for name in names:
+        print(f"{status[name]:>9}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
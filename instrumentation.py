@@ -0,0 +1,205 @@
+"""Timing spans for dashboard reruns and the helpers they call.
+
+A rerun is bracketed by ``start_run()`` / ``finish_run()``. In between,
+``section(name)`` marks the start of the next top-to-bottom section of the
+script (closing the previous one), and ``span(name)`` / ``@timed`` nest
+timings inside it. ``fragment(name)`` does the same for a Streamlit fragment
+and records a run of its own when the fragment reruns alone. Outside a run,
+spans cost one thread-local lookup.
+
+Everything is opt-in through environment variables:
+
+ENERGY_PROFILE_LOG=path       append one JSON line per rerun (all spans) to ``path``
+ENERGY_PROFILE_MEMORY=1       record tracemalloc deltas per span (process-wide, so
+                              concurrent sessions add noise)
+ENERGY_PROFILE=cprofile       capture a profile per rerun; ``pyinstrument`` also works
+ENERGY_PROFILE_DIR=profiles   where profiles are written (default: profiles/)
+ENERGY_DEBUG_PANEL=1          show the rerun breakdown in the dashboard sidebar
+                              (``?debug=1`` in the URL does the same per session)
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+LOG_PATH = os.environ.get("ENERGY_PROFILE_LOG")
+TRACK_MEMORY = os.environ.get("ENERGY_PROFILE_MEMORY") == "1"
+PROFILER = os.environ.get("ENERGY_PROFILE", "").lower()
+PROFILE_DIR = os.environ.get("ENERGY_PROFILE_DIR", "profiles")
+DEBUG_PANEL = os.environ.get("ENERGY_DEBUG_PANEL") == "1"
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+def _memory() -> int:
+    return tracemalloc.get_traced_memory()[0] if TRACK_MEMORY else 0
+
+
+class Recorder:
+    """Spans of one rerun, in the order they finished."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.spans = []
+        self.start = time.perf_counter()
+        self._stack = []      # names of the open spans
+        self._section = None  # (name, start, memory) of the open top-level section
+        self._profiler = None
+
+    def record(self, name, start, mem_start, depth, parent):
+        entry = {
+            "name": name,
+            "parent": parent,
+            "depth": depth,
+            "start_ms": round((start - self.start) * 1000, 3),
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        if TRACK_MEMORY:
+            entry["mem_kb"] = round((_memory() - mem_start) / 1024, 1)
+        self.spans.append(entry)
+
+    def close_section(self):
+        if self._section is not None:
+            name, start, mem = self._section
+            self.record(name, start, mem, 0, None)
+            self._section = None
+            self._stack.clear()
+
+
+def current():
+    return getattr(_local, "recorder", None)
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as a child of the current section/span."""
+    rec = current()
+    if rec is None:
+        yield
+        return
+    parent = rec._stack[-1] if rec._stack else None
+    depth = len(rec._stack)
+    start, mem = time.perf_counter(), _memory()
+    rec._stack.append(name)
+    try:
+        yield
+    finally:
+        rec._stack.pop()
+        rec.record(name, start, mem, depth, parent)
+
+
+def timed(name=None):
+    """Decorator form of ``span``; the span name defaults to the function's."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current() is None:
+                return fn(*args, **kwargs)
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def section(name: str) -> None:
+    """End the previous top-level section and start ``name``."""
+    rec = current()
+    if rec is None:
+        return
+    rec.close_section()
+    rec._section = (name, time.perf_counter(), _memory())
+    rec._stack.append(name)
+
+
+@contextmanager
+def fragment(name: str, **fields):
+    """Section of the current rerun, or a run of its own when a fragment reruns alone.
+
+    Streamlit reruns a fragment without executing the rest of the script, so
+    no run is open on the thread; one is started and finished around it.
+    """
+    if current() is not None:
+        section(name)
+        yield
+        return
+    rec = start_run(f"fragment:{name}")
+    try:
+        yield
+    finally:
+        finish_run(rec, **fields)
+
+
+def _start_profiler(rec: Recorder) -> None:
+    try:
+        if PROFILER == "cprofile":
+            import cProfile
+            prof = cProfile.Profile()
+            prof.enable()
+        elif PROFILER == "pyinstrument":
+            from pyinstrument import Profiler
+            prof = Profiler()
+            prof.start()
+        else:
+            return
+    except (ImportError, ValueError, RuntimeError):
+        return  # not installed, or another session's rerun is being profiled
+    rec._profiler = prof
+
+
+def _stop_profiler(rec: Recorder):
+    prof, rec._profiler = rec._profiler, None
+    if prof is None:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = os.path.join(PROFILE_DIR, f"{rec.name}-{time.strftime('%Y%m%d-%H%M%S')}-{threading.get_ident()}")
+    if PROFILER == "cprofile":
+        prof.disable()
+        path = stem + ".prof"
+        prof.dump_stats(path)
+    else:
+        prof.stop()
+        path = stem + ".html"
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(prof.output_html())
+    return path
+
+
+def start_run(name: str = "rerun") -> Recorder:
+    """Begin recording a rerun on this thread (replaces any unfinished one)."""
+    if TRACK_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    rec = Recorder(name)
+    _local.recorder = rec
+    _start_profiler(rec)
+    return rec
+
+
+def finish_run(rec: Recorder, **fields) -> dict:
+    """Close the run, write its JSON line if configured and return the summary.
+
+    Extra ``fields`` (e.g. the selected sector) are added to the log line.
+    """
+    rec.close_section()
+    if current() is rec:
+        _local.recorder = None
+    summary = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "run": rec.name,
+        "total_ms": round((time.perf_counter() - rec.start) * 1000, 3),
+        "spans": rec.spans,
+        **fields,
+    }
+    profile = _stop_profiler(rec)
+    if profile:
+        summary["profile"] = profile
+    if LOG_PATH:
+        line = json.dumps(summary, default=str)
+        with _log_lock, open(LOG_PATH, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+    return summary
@@ -0,0 +1,468 @@
+"""PDF report pipeline: comparison summary, change-bar chart and ReportLab document.
+
+Kept free of Streamlit so the dashboard and the batch CLI share one code path.
+``generate_report`` covers one sector; ``generate_overview_report`` puts
+every sector's trend, calendar heatmap and change bar behind a summary
+table, with the images rendered across a pool of worker processes.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import pandas as pd
+import plotly.express as px
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab import rl_config
+
+from analytics import DEFAULT_ANOMALY_THRESHOLD, DEFAULT_ANOMALY_WINDOW
+from chart_budget import WEBGL_THRESHOLD
+from chart_export import cached_png, peek_png, remember_png
+from energy_cube import EnergyCube, cached_cube
+from energy_data import DATA_PATH, load_energy_data
+from figures import FIGURES
+from forecast import DEFAULT_HORIZON, DEFAULT_MODEL, MODELS
+from instrumentation import span, timed
+from snapshot import load_png
+
+REPORT_WORKERS = int(os.environ.get("ENERGY_REPORT_WORKERS", 4))   # default image render processes
+PDF_POINT_BUDGET = WEBGL_THRESHOLD   # keeps report charts on SVG traces, which static export draws reliably
+
+# Binary image streams: the pure-Python ASCII85 encoder otherwise takes most of a build with many charts
+rl_config.useA85 = 0
+
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+# Domain hints
+REASON_BY_FUEL_DIRECTION = {
+    ("Coal", "up"):
+        "Coal use rose due to gas price spikes and security-of-supply concerns, temporary coal plant reactivation, and fuel switching by energy-intensive industry while low-carbon capacity was constrained.",
+    ("Coal", "down"):
+        "Coal declined under phase-out policies and carbon pricing, closures of coal plants and coking capacity, tighter air-quality rules, and sustained switching to gas and electricity across power and industry.",
+
+    ("Coke and breeze", "up"):
+        "Coke demand increased with stronger blast-furnace steel output, limited scrap availability that slowed shifts to EAF routes, and delays in decarbonisation projects at integrated mills.",
+    ("Coke and breeze", "down"):
+        "Coke use fell as steelmaking restructured toward electric-arc furnaces, air-quality and carbon rules tightened, and integrated capacity was rationalised or operated at lower load.",
+
+    ("Natural gas", "up"):
+        "Natural gas rose through coal-to-gas switching, expansion of the gas grid and boilers, CCGT growth in power, and favourable relative fuel prices versus coal and oil.",
+    ("Natural gas", "down"):
+        "Gas demand fell with efficiency upgrades, heat-pump adoption, tighter building codes, high gas prices, industrial output weakness, and warmer winters reducing space-heating needs.",
+
+    ("Electricity", "up"):
+        "Electricity increased with electrification of transport, heating and industry, heat-pump and EV uptake, data-centre growth, and population or income effects outpacing efficiency gains.",
+    ("Electricity", "down"):
+        "Electricity use declined as appliance and building standards improved, economic slowdown reduced activity, rooftop PV increased self-consumption, and mild winters and behaviour changes curbed demand.",
+
+    ("Bioenergy & waste", "up"):
+        "Bioenergy grew through landfill diversion, biomass co-firing, waste-to-energy projects, renewable incentives, and combined heat-and-power deployment in municipal and industrial sites.",
+    ("Bioenergy & waste", "down"):
+        "Bioenergy fell as subsidies expired, biomass supply tightened, air-quality limits constrained plants, and stricter carbon accounting reduced eligibility for projects.",
+
+    ("Petroleum products", "up"):
+        "Oil products rose with travel and freight rebounds, aviation recovery, relatively low oil prices, and modal shifts back to private transport.",
+    ("Petroleum products", "down"):
+        "Oil products declined with tighter vehicle efficiency standards, EV adoption and charging rollout, public-transport and active-travel shifts, higher fuel taxes, and teleworking.",
+
+    ("Other solid fuels", "up"):
+        "Other solids increased due to specific industrial process needs, temporary substitution for gas amid price or supply shocks, and short-term fuel availability constraints.",
+    ("Other solid fuels", "down"):
+        "Other solids declined with the phase-out of legacy industrial fuels, emissions compliance costs, and process modernisation eliminating solid-fuel steps.",
+
+    ("Town gas", "up"):
+        "A rise in town gas usually reflects data quirks or small heritage networks; widespread manufactured gas was historically replaced by natural gas decades ago.",
+    ("Town gas", "down"):
+        "Town gas fell as remaining manufactured-gas services were retired or metered more accurately, leaving only residual or statistical balancing quantities.",
+}
+# Generic fallback
+DEFAULT_REASON = {
+    "up":   "The increase likely reflects activity growth, substitution from other fuels, relative price advantages, and policy or technology shifts favouring this fuel.",
+    "down": "The decrease likely reflects efficiency gains, substitution to lower-carbon options, price pressures, environmental compliance, and structural economic changes.",
+}
+
+def compute_compare_summary(df, sector, year_a, year_b, path=DATA_PATH):
+    """Compatibility wrapper: call ``cached_cube(path).compare_summary`` directly.
+
+    Outer join of the two years (missing -> 0), n/a % on a zero base, largest
+    change first. The shared frame of ``path`` is read from its cached cube;
+    any other frame still pays for a cube build per call.
+    """
+    cube = cached_cube(path) if df is load_energy_data(path) else EnergyCube.from_frame(df)
+    return cube.compare_summary(sector, year_a, year_b)
+
+def make_change_bar(summary_df, sector, year_a, year_b):
+    # a bar chart based on %
+    tmp = summary_df.copy()
+    tmp['Change_%_num'] = tmp['Change_%'].fillna(0)
+    fig = px.bar(
+        tmp, x='Fuel', y='Change_%_num',
+        title=f"{sector}: Change % by fuel ({year_a} → {year_b})"
+    )
+    fig.update_layout(paper_bgcolor='black', plot_bgcolor='black', font_color='white')
+    fig.update_yaxes(title="Change %")
+    return fig
+
+def render_change_bar(summary_df, sector, year_a, year_b, version) -> bytes:
+    """White-background change-bar PNG, memoised per data version and selection.
+
+    A PNG baked by snapshot.py for the current data is used instead of rendering.
+    """
+    return cached_png((version, "change_bar", sector, year_a, year_b),
+                      lambda: make_change_bar(summary_df, sector, year_a, year_b),
+                      load=lambda: load_png("change_bar", (sector, year_a, year_b), version))
+
+# ---------------- Images for multi-section reports ----------------
+# An image is a spec (figure name, *deps): "change_bar" or a figures.FIGURES
+# name with that builder's arguments. Specs are hashable, so an image used by
+# several sections is rendered once.
+def trend_spec(sector, model=DEFAULT_MODEL, horizon=DEFAULT_HORIZON):
+    """The dashboard's default trend chart, thinned for a static image."""
+    return ("trend", sector, DEFAULT_ANOMALY_WINDOW, DEFAULT_ANOMALY_THRESHOLD, PDF_POINT_BUDGET, model, horizon)
+
+def overview_specs(sectors, year_a, year_b, model=DEFAULT_MODEL, horizon=DEFAULT_HORIZON):
+    """Every image ``generate_overview_report`` places, in page order."""
+    specs = [("heatmap", year_a), ("heatmap", year_b)]
+    for sector in sectors:
+        specs += [trend_spec(sector, model, horizon), ("calendar", sector), ("change_bar", sector, year_a, year_b)]
+    return specs
+
+def _pdf_figure(spec, path):
+    name, *deps = spec
+    if name == "change_bar":
+        sector, year_a, year_b = deps
+        return make_change_bar(cached_cube(path).compare_summary(sector, year_a, year_b), sector, year_a, year_b)
+    fig = FIGURES[name](*deps, path=path)
+    fig.update_xaxes(scaleanchor=None)   # heatmaps fill the image instead of keeping square cells
+    return fig
+
+def render_png(spec, version, path=DATA_PATH) -> bytes:
+    """White-background PNG of ``spec``, memoised per data version (same key as ``render_change_bar``)."""
+    return cached_png((version, *spec), lambda: _pdf_figure(spec, path))
+
+def _render_batch(path, version, specs):
+    """Worker: render one batch with this process's warm renderer."""
+    return [(spec, render_png(spec, version, path)) for spec in specs]
+
+def _image_pool(workers):
+    """The shared pool, replaced by a larger one when more than its size is asked for."""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size < workers:
+            # a replaced pool is not shut down here: it finishes the work already submitted
+            # and its processes exit once the callers holding it let go
+            # spawned rather than forked: the parent may be a multi-threaded Streamlit server
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_size = workers
+        return _pool
+
+def _drop_pool(pool):
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is pool:
+            _pool, _pool_size = None, 0
+
+@timed()
+def render_images(specs, version, path=DATA_PATH, workers=None) -> dict:
+    """PNG per spec: memoised or baked images are reused, the rest rendered concurrently.
+
+    Missing images are split into one batch per worker process of a pool
+    kept for the life of the process, so each worker starts its renderer
+    once. ``workers`` (default ``REPORT_WORKERS``, capped at the CPU count)
+    sets the number of batches and, when it exceeds the pool's size, the
+    size of a new pool; with a single worker (or image) they are rendered
+    here, as are the images of a pool that lost a worker.
+    """
+    pngs, todo = {}, []
+    for spec in dict.fromkeys(specs):
+        png = peek_png((version, *spec))
+        if png is None:
+            png = load_png(spec[0], spec[1:], version)
+        if png is None:
+            todo.append(spec)
+        else:
+            pngs[spec] = png
+    if not todo:
+        return pngs
+
+    workers = max(1, min(workers or REPORT_WORKERS, os.cpu_count() or 1, len(todo)))
+    if workers == 1:
+        results = [_render_batch(path, version, todo)]
+    else:
+        pool = _image_pool(workers)
+        try:
+            futures = [pool.submit(_render_batch, path, version, todo[i::workers]) for i in range(workers)]
+            results = [f.result() for f in futures]
+        except BrokenProcessPool:
+            # a worker died (killed, out of memory): the next call starts a fresh pool
+            _drop_pool(pool)
+            results = [_render_batch(path, version, todo)]
+    for batch in results:
+        for spec, png in batch:
+            remember_png((version, *spec), png)
+            pngs[spec] = png
+    return pngs
+
+def _kpi_paragraph(summary_df, sector, year_a, year_b, styles):
+    total_a = summary_df[f'Consumption_ktoe_{year_a}'].sum()
+    total_b = summary_df[f'Consumption_ktoe_{year_b}'].sum()
+    if total_a == 0:
+        total_pct = "n/a"
+    else:
+        total_pct = f"{(total_b-total_a)/total_a*100:+.2f}%"
+    text = (f"<b>Sector:</b> {sector} &nbsp;&nbsp; "
+            f"<b>Period:</b> {year_a} → {year_b} &nbsp;&nbsp; "
+            f"<b>Total:</b> {total_a:,.0f} → {total_b:,.0f} ktoe "
+            f"(<b>{total_pct}</b>)")
+    return Paragraph(text, styles['Normal'])
+
+def _reason_for(fuel_name: str, direction: str) -> str:
+    """direction: 'up' or 'down'"""
+    return REASON_BY_FUEL_DIRECTION.get((fuel_name, direction),
+                                        DEFAULT_REASON[direction])
+
+def _top_change_paragraphs(summary_df, styles):
+    # Exclude total and only look at specific fuels
+    dfp = summary_df[~summary_df['Fuel'].str.lower().str.contains('total', na=False)].copy()
+    dfp = dfp[~dfp['Change_%'].isna()]
+    if dfp.empty:
+        return [Paragraph("No valid percentage changes available.", styles['Normal'])]
+
+    # Maximum % increase & decrease
+    top_up = dfp.sort_values('Change_%', ascending=False).iloc[0]
+    top_dn = dfp.sort_values('Change_%').iloc[0]
+
+    up_reason = _reason_for(top_up['Fuel'], "up")
+    dn_reason = _reason_for(top_dn['Fuel'], "down")
+
+    p1_txt = (
+        f"<b>Largest % increase:</b> {top_up['Fuel']} "
+        f"({top_up['Change_%']:+.2f}%, {top_up['Change_ktoe']:+,.0f} ktoe). "
+        f"{up_reason}"
+    )
+    p2_txt = (
+        f"<b>Largest % decrease:</b> {top_dn['Fuel']} "
+        f"({top_dn['Change_%']:+.2f}%, {top_dn['Change_ktoe']:+,.0f} ktoe). "
+        f"{dn_reason}"
+    )
+
+    return [Paragraph(p1_txt, styles['BodySmall']),
+            Paragraph(p2_txt, styles['BodySmall'])]
+
+def _summary_table(summary_df, year_a, year_b):
+    data = [["Fuel", f"ktoe {year_a}", f"ktoe {year_b}", "Δ ktoe", "Δ %"]]
+    for _, r in summary_df.iterrows():
+        pct = "n/a" if pd.isna(r['Change_%']) else f"{r['Change_%']:.2f}%"
+        data.append([
+            r['Fuel'],
+            f"{r[f'Consumption_ktoe_{year_a}']:,.2f}",
+            f"{r[f'Consumption_ktoe_{year_b}']:,.2f}",
+            f"{r['Change_ktoe']:+,.2f}",
+            pct
+        ])
+    t = Table(data, hAlign="LEFT", colWidths=[150, 90, 90, 80, 70])
+    t.setStyle(TableStyle([
+        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#2e3a46")),
+        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+        ("GRID", (0,0), (-1,-1), 0.3, colors.grey),
+        ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.lightgrey]),
+        ("ALIGN", (1,1), (-1,-1), "RIGHT"),
+    ]))
+    return t
+
+def _outlook_table(outlook_df):
+    last_col, proj_col = outlook_df.columns[1], outlook_df.columns[2]
+    data = [["Fuel", f"ktoe {last_col.rsplit('_', 1)[1]}", f"projected {proj_col.rsplit('_', 1)[1]}", "Δ %"]]
+    for _, r in outlook_df.iterrows():
+        pct = "n/a" if pd.isna(r['Change_%']) else f"{r['Change_%']:+.2f}%"
+        data.append([r['Fuel'], f"{r[last_col]:,.2f}", f"{r[proj_col]:,.2f}", pct])
+    t = Table(data, hAlign="LEFT", colWidths=[150, 90, 100, 70])
+    t.setStyle(TableStyle([
+        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#2e3a46")),
+        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+        ("GRID", (0,0), (-1,-1), 0.3, colors.grey),
+        ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.lightgrey]),
+        ("ALIGN", (1,1), (-1,-1), "RIGHT"),
+    ]))
+    return t
+
+def _styles():
+    styles = getSampleStyleSheet()
+
+    # a new style name that doesn't conflict
+    if 'BodySmall' not in styles.byName:
+        styles.add(ParagraphStyle(
+            name='BodySmall',
+            parent=styles['BodyText'],   # Inherits BodyText
+            fontSize=10,
+            leading=14
+        ))
+    return styles
+
+def _document(target):
+    return SimpleDocTemplate(target, pagesize=A4, leftMargin=28, rightMargin=28, topMargin=28, bottomMargin=28)
+
+def _disclaimer(styles, projections=False):
+    return Paragraph(
+        "<i>Disclaimer: Percentage changes are relative to the base year values; "
+        "n/a indicates zero base. The analyses presented here suggest plausible drivers based on contextual evidence. They are intended as interpretative insights rather than definitive causal claims."
+        + (" Projections extrapolate recent trends and do not account for policy or price changes."
+           if projections else "")
+        + "</i>",
+        styles['BodySmall']
+    )
+
+@timed()
+def build_pdf_report(summary_df, sector, year_a, year_b, change_bar_png: bytes,
+                     outlook_df=None, outlook_title=None, target=None):
+    """``outlook_df`` (from ``Forecasts.outlook``) adds a projection table after the highlights.
+
+    Returns the PDF bytes, or writes to ``target`` (a path or binary file) and returns it.
+    """
+    buf = BytesIO() if target is None else target
+    doc = _document(buf)
+    styles = _styles()
+
+    story = []
+    story.append(Paragraph(f"UK Final Energy Consumption — {sector} ({year_a} vs {year_b})", styles['Title']))
+    story.append(Spacer(1, 8))
+    story.append(_kpi_paragraph(summary_df, sector, year_a, year_b, styles))
+    story.append(Spacer(1, 10))
+
+    story.append(_summary_table(summary_df, year_a, year_b))
+    story.append(Spacer(1, 12))
+
+    story.append(Paragraph("Change % by fuel", styles['Heading3']))
+    story.append(Spacer(1, 6))
+    story.append(Image(BytesIO(change_bar_png), width=460, height=280))
+    story.append(Spacer(1, 10))
+
+    story.append(Paragraph("Highlights", styles['Heading3']))
+    for p in _top_change_paragraphs(summary_df, styles):
+        story.append(p)
+        story.append(Spacer(1, 6))
+
+    has_outlook = outlook_df is not None and not outlook_df.empty
+    if has_outlook:
+        story.append(Paragraph(outlook_title or "Outlook", styles['Heading3']))
+        story.append(Spacer(1, 6))
+        story.append(_outlook_table(outlook_df))
+        story.append(Spacer(1, 10))
+
+    story.append(Spacer(1, 4))
+    story.append(_disclaimer(styles, has_outlook))
+
+    doc.build(story)
+    return buf.getvalue() if target is None else target
+
+@timed()
+def generate_report(cube: EnergyCube, sector, year_a, year_b, version, forecasts=None,
+                    model=DEFAULT_MODEL, target=None):
+    """Summary -> change bar -> PDF for one (sector, year_a, year_b).
+
+    With ``forecasts`` (a ``forecast.Forecasts``), the report ends with the
+    sector's projection to the end of the horizon under ``model``. The PDF
+    is returned as bytes, or written to ``target`` as in ``build_pdf_report``.
+    """
+    summary_df = cube.compare_summary(sector, year_a, year_b)
+    png = render_change_bar(summary_df, sector, year_a, year_b, version)
+    outlook, title = None, None
+    if forecasts is not None:
+        outlook = forecasts.outlook(sector, model)
+        title = f"Outlook to {forecasts.years[-1]} ({MODELS[model].lower()})"
+    return build_pdf_report(summary_df, sector, year_a, year_b, png, outlook, title, target)
+
+def _sector_total(summary_df, year):
+    # the sector's own Total row when it has one, else the sum of its fuels
+    column = summary_df[f'Consumption_ktoe_{year}']
+    total = summary_df['Fuel'] == 'Total'
+    return float(column[total].sum() if total.any() else column.sum())
+
+def _overview_table(summaries, year_a, year_b):
+    data = [["Sector", f"ktoe {year_a}", f"ktoe {year_b}", "Δ ktoe", "Δ %"]]
+    for sector, summary_df in summaries.items():
+        total_a, total_b = _sector_total(summary_df, year_a), _sector_total(summary_df, year_b)
+        pct = "n/a" if total_a == 0 else f"{(total_b - total_a) / total_a * 100:+.2f}%"
+        data.append([Paragraph(sector), f"{total_a:,.0f}", f"{total_b:,.0f}", f"{total_b - total_a:+,.0f}", pct])
+    t = Table(data, hAlign="LEFT", colWidths=[190, 85, 85, 85, 70])
+    t.setStyle(TableStyle([
+        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#2e3a46")),
+        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+        ("GRID", (0,0), (-1,-1), 0.3, colors.grey),
+        ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.lightgrey]),
+        ("ALIGN", (1,1), (-1,-1), "RIGHT"),
+        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
+    ]))
+    return t
+
+@timed()
+def build_overview_report(target, summaries, year_a, year_b, images, trend_specs, projections=False):
+    """Multi-sector document: summary table and Sector×Fuel heatmaps, then one section per sector.
+
+    ``summaries`` maps sector -> ``compare_summary`` frame, ``images`` maps
+    spec -> PNG (see ``overview_specs``) and ``trend_specs`` sector -> the
+    trend spec. The PDF is written straight to ``target`` (a path or binary
+    file) rather than collected in memory and copied out as bytes.
+    """
+    doc = _document(target)
+    styles = _styles()
+
+    def image(spec, height=270):
+        return Image(BytesIO(images[spec]), width=460, height=height)
+
+    story = [
+        Paragraph(f"UK Final Energy Consumption — All sectors ({year_a} vs {year_b})", styles['Title']),
+        Spacer(1, 8),
+        _overview_table(summaries, year_a, year_b),
+        Spacer(1, 12),
+        Paragraph("Consumption by sector and fuel", styles['Heading3']),
+        image(("heatmap", year_a), 250),
+        image(("heatmap", year_b), 250),
+    ]
+    for sector, summary_df in summaries.items():
+        story += [
+            PageBreak(),
+            Paragraph(f"{sector} ({year_a} vs {year_b})", styles['Heading1']),
+            _kpi_paragraph(summary_df, sector, year_a, year_b, styles),
+            Spacer(1, 8),
+            _summary_table(summary_df, year_a, year_b),
+            Spacer(1, 10),
+            Paragraph("Trend and anomalies", styles['Heading3']),
+            image(trend_specs[sector]),
+            Paragraph("Yearly fuel usage", styles['Heading3']),
+            image(("calendar", sector)),
+            Paragraph("Change % by fuel", styles['Heading3']),
+            image(("change_bar", sector, year_a, year_b)),
+            Paragraph("Highlights", styles['Heading3']),
+        ]
+        for p in _top_change_paragraphs(summary_df, styles):
+            story += [p, Spacer(1, 6)]
+
+    story += [Spacer(1, 4), _disclaimer(styles, projections)]
+    doc.build(story)
+    return target
+
+@timed()
+def generate_overview_report(cube: EnergyCube, year_a, year_b, version, target, sectors=None,
+                             model=DEFAULT_MODEL, horizon=DEFAULT_HORIZON, path=DATA_PATH, workers=None):
+    """Consolidated report for ``sectors`` (default: all), written to ``target``.
+
+    Images come from the PNG cache, the snapshot cache or ``render_images``;
+    ``model=None`` leaves the projections off the trend charts.
+    """
+    sectors = list(sectors or cube.sectors)
+    summaries = {sector: cube.compare_summary(sector, year_a, year_b) for sector in sectors}
+    trend_specs = {sector: trend_spec(sector, model, horizon) for sector in sectors}
+    with span("overview_images"):
+        images = render_images(overview_specs(sectors, year_a, year_b, model, horizon), version, path, workers)
+    return build_overview_report(target, summaries, year_a, year_b, images, trend_specs, model is not None)
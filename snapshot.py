@@ -0,0 +1,311 @@
+"""Bake the dashboard's default views offline into a content-addressed cache.
+
+Examples:
+    # every Sector x Year view plus the first-vs-last-year PDF images
+    python snapshot.py
+
+    # more year pairs, 8 worker processes, and drop snapshots of older data
+    python snapshot.py --pairs 1990:2023 2000:2023 --workers 8 --prune
+
+The data changes about once a year, so the views every visitor opens at the
+dashboard's default settings are built here once: the trend (with anomalies
+and the default forecast), heatmap, radar, box, calendar heatmap, cost chart
+and cost table for every sector and year, plus the white-background PNGs
+of the PDF path (the all-sectors report's images for each pair). Layout
+under ``SNAPSHOT_DIR`` (``ENERGY_SNAPSHOT_DIR``, default ``snapshots/``):
+
+    objects/ab/cdef...     figure JSON, table JSON or PNG, named by its SHA-256
+    index/<stamp>.json     view key -> object digest
+
+The stamp hashes the data version, the price files and the source of the
+modules that shape a view, so the dashboard (``load_figure`` /
+``load_table``) and the PDF path (``load_png``) only read snapshots baked
+from exactly what they would compute, and build live otherwise. Objects
+are shared between bakes when a view did not change.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import StringIO
+
+import pandas as pd
+import plotly.io as pio
+
+from analytics import DEFAULT_ANOMALY_THRESHOLD, DEFAULT_ANOMALY_WINDOW
+from chart_budget import POINT_BUDGET
+from costs import price_stamp
+from energy_cube import cached_cube
+from energy_data import DATA_PATH, data_version
+from figures import FIGURES, TABLES
+from forecast import DEFAULT_HORIZON, DEFAULT_MODEL
+
+SNAPSHOT_DIR = os.environ.get("ENERGY_SNAPSHOT_DIR", "snapshots")
+# Modules whose code decides what a baked view looks like
+SOURCES = ("figures.py", "chart_budget.py", "chart_export.py", "report.py",
+           "analytics.py", "costs.py", "energy_cube.py", "forecast.py")
+
+_indexes = {}         # (root, stamp) -> (index mtime, views)
+_price_digests = {}   # price_stamp() -> digest of the price files
+_index_lock = threading.Lock()
+_code_digest = None
+
+
+# ---------------- Stamp and keys ----------------
+def _digest_files(paths) -> str:
+    h = hashlib.sha256()
+    for p in paths:
+        try:
+            with open(p, "rb") as fh:
+                h.update(hashlib.sha256(fh.read()).digest())
+        except OSError:
+            h.update(b"-")
+    return h.hexdigest()
+
+
+def snapshot_stamp(version: str) -> str:
+    """Version of the views for data ``version``: data, prices and the builders' code."""
+    global _code_digest
+    if _code_digest is None:
+        here = os.path.dirname(os.path.abspath(__file__))
+        _code_digest = _digest_files(os.path.join(here, name) for name in SOURCES)
+    prices = price_stamp()
+    price_digest = _price_digests.get(prices)
+    if price_digest is None:
+        price_digest = _price_digests[prices] = _digest_files(p for p, _ in prices)
+    h = hashlib.sha256(version.encode())
+    h.update(price_digest.encode())
+    h.update(_code_digest.encode())
+    return h.hexdigest()[:32]
+
+
+def view_key(name, deps) -> str:
+    """Index key of a view: its name and dependencies, as the dashboard passes them."""
+    return json.dumps([name, *deps], ensure_ascii=False, default=lambda o: o.item())
+
+
+def _object_path(root, digest):
+    return os.path.join(root, "objects", digest[:2], digest[2:])
+
+
+def _index_path(root, stamp):
+    return os.path.join(root, "index", f"{stamp}.json")
+
+
+def _write_atomic(target, data: bytes) -> None:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, target)
+
+
+def put_object(data: bytes, root: str = SNAPSHOT_DIR) -> str:
+    """Store ``data`` under its SHA-256 (once) and return the digest."""
+    digest = hashlib.sha256(data).hexdigest()
+    target = _object_path(root, digest)
+    if not os.path.exists(target):
+        _write_atomic(target, data)
+    return digest
+
+
+# ---------------- Lookups ----------------
+def _views(stamp, root) -> dict:
+    """The index for ``stamp``, re-read only when the file changes ({} if there is none)."""
+    path = _index_path(root, stamp)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    with _index_lock:
+        cached = _indexes.get((root, stamp))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path, encoding="utf-8") as fh:
+            views = json.load(fh)["views"]
+    except (OSError, ValueError, KeyError):
+        views = {}
+    with _index_lock:
+        _indexes[(root, stamp)] = (mtime, views)
+    return views
+
+
+def _load(name, deps, version, root):
+    digest = _views(snapshot_stamp(version), root).get(view_key(name, deps))
+    if digest is None:
+        return None
+    try:
+        with open(_object_path(root, digest), "rb") as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+def load_figure(name, deps, version: str, root: str = SNAPSHOT_DIR):
+    """Baked ``FIGURES[name](*deps)`` for data ``version`` (and the current prices/code), or None."""
+    data = _load(name, deps, version, root)
+    return None if data is None else pio.from_json(data.decode("utf-8"))
+
+
+def load_table(name, deps, version: str, root: str = SNAPSHOT_DIR):
+    """Baked ``TABLES[name](*deps)`` for data ``version``, or None."""
+    data = _load(name, deps, version, root)
+    return None if data is None else pd.read_json(StringIO(data.decode("utf-8")), orient="split")
+
+
+def load_png(name, deps, version: str, root: str = SNAPSHOT_DIR):
+    """Baked PDF image of a ``report`` spec (name, *deps) for data ``version``, or None."""
+    return _load(f"png:{name}", deps, version, root)
+
+
+# ---------------- Bake ----------------
+def build_jobs(cube, sectors, pairs):
+    """(name, deps) of every view at the dashboard's default settings."""
+    budget = POINT_BUDGET
+    jobs = [("scatter", (budget,))]
+    jobs += [("heatmap", (year,)) for year in cube.years]
+    for sector in sectors:
+        jobs += [
+            ("trend", (sector, DEFAULT_ANOMALY_WINDOW, DEFAULT_ANOMALY_THRESHOLD, budget,
+                       DEFAULT_MODEL, DEFAULT_HORIZON)),
+            ("box", (sector, budget)),
+            ("calendar", (sector,)),
+            ("cost", (sector, budget)),
+        ]
+        for year in cube.years:
+            jobs += [("radar", (sector, year)), ("cost_table", (sector, year))]
+    # reportlab is only needed here, not by the dashboard's lookups
+    from report import overview_specs
+
+    for a, b in pairs:
+        jobs += [(f"png:{spec[0]}", spec[1:]) for spec in overview_specs(sectors, a, b)]
+    return list(dict.fromkeys(jobs))
+
+
+def _render(name, deps, path) -> bytes:
+    if name in FIGURES:
+        return FIGURES[name](*deps, path=path).to_json().encode("utf-8")
+    if name in TABLES:
+        table = TABLES[name](*deps, path=path)
+        return table.to_json(orient="split", index=False, double_precision=15).encode("utf-8")
+    from report import render_png
+
+    return render_png((name[len("png:"):], *deps), data_version(path), path)
+
+
+def _bake_batch(data_path: str, root: str, jobs):
+    """Worker: render and store one batch with a single data load (and renderer)."""
+    return [(view_key(name, deps), put_object(_render(name, deps, data_path), root))
+            for name, deps in jobs]
+
+
+def _save_index(root, stamp, data_path, views) -> None:
+    index = {"stamp": stamp, "data_version": data_version(data_path),
+             "baked": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "views": views}
+    _write_atomic(_index_path(root, stamp), json.dumps(index, indent=1, sort_keys=True).encode("utf-8"))
+
+
+def bake(jobs, data_path=DATA_PATH, root=SNAPSHOT_DIR, workers=None, force=False, log=print):
+    """Bake ``jobs`` into ``root`` and return (baked, skipped) counts.
+
+    Views already in the index for the current stamp are skipped unless
+    ``force`` is set.
+    """
+    stamp = snapshot_stamp(data_version(data_path))
+    views = dict(_views(stamp, root))
+    todo = [job for job in jobs
+            if force
+            or view_key(*job) not in views
+            or not os.path.exists(_object_path(root, views[view_key(*job)]))]
+    skipped = len(jobs) - len(todo)
+    if not todo:
+        return 0, skipped
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+    batches = [todo[i::workers] for i in range(workers)]
+    if workers == 1:
+        pool = None
+        results = iter([_bake_batch(data_path, root, batches[0])])
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        futures = [pool.submit(_bake_batch, data_path, root, batch) for batch in batches]
+        results = (f.result() for f in as_completed(futures))
+
+    baked = 0
+    try:
+        for entries in results:
+            views.update(entries)
+            baked += len(entries)
+            log(f"{baked}/{len(todo)} views baked")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        _save_index(root, stamp, data_path, views)
+    return baked, skipped
+
+
+def prune(root=SNAPSHOT_DIR, keep=()) -> int:
+    """Remove indexes other than the ``keep`` stamps and the objects only they used."""
+    index_dir = os.path.join(root, "index")
+    used = set()
+    for name in os.listdir(index_dir) if os.path.isdir(index_dir) else []:
+        if name[:-len(".json")] in keep:
+            used.update(_views(name[:-len(".json")], root).values())
+        else:
+            os.remove(os.path.join(index_dir, name))
+    removed = 0
+    for dirpath, _, files in os.walk(os.path.join(root, "objects")):
+        for name in files:
+            if os.path.basename(dirpath) + name not in used:
+                os.remove(os.path.join(dirpath, name))
+                removed += 1
+    return removed
+
+
+def _parse_pair(text: str):
+    try:
+        a, b = (int(x) for x in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YEAR_A:YEAR_B, got {text!r}")
+    return a, b
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bake the dashboard's default views into a snapshot cache.")
+    parser.add_argument("--data", default=DATA_PATH, help="standardized CSV (default: %(default)s)")
+    parser.add_argument("--out", default=SNAPSHOT_DIR, help="snapshot directory (default: %(default)s)")
+    parser.add_argument("--sectors", nargs="+", help="sectors to bake (default: all)")
+    parser.add_argument("--pairs", nargs="+", type=_parse_pair, default=[], metavar="A:B",
+                        help="year pairs to bake PDF images for besides first:last year")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="rebuild views that are already baked")
+    parser.add_argument("--prune", action="store_true", help="drop snapshots of other data/code versions")
+    args = parser.parse_args(argv)
+
+    cube = cached_cube(args.data)
+    sectors = args.sectors or cube.sectors
+    unknown = [s for s in sectors if s not in cube.sectors]
+    if unknown:
+        parser.error(f"unknown sector(s): {', '.join(unknown)}")
+    # the dashboard's default comparison, then any extra pairs
+    pairs = [(a, b) for a, b in dict.fromkeys([(cube.years[0], cube.years[-1]), *args.pairs]) if a != b]
+    bad_years = sorted({y for p in pairs for y in p} - set(cube.years))
+    if bad_years:
+        parser.error(f"year(s) not in the data: {', '.join(map(str, bad_years))}")
+
+    start = time.perf_counter()
+    baked, skipped = bake(build_jobs(cube, sectors, pairs), args.data, args.out, args.workers, args.force)
+    print(f"Done: {baked} baked, {skipped} up to date, "
+          f"{time.perf_counter() - start:.1f}s -> {os.path.abspath(args.out)}")
+    if args.prune:
+        print(f"Pruned {prune(args.out, keep={snapshot_stamp(data_version(args.data))})} unused objects")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())